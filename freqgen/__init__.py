@@ -1,5 +1,5 @@
 from .freqgen import *
-from .generate import generate
+from .generate import Evaluator, generate, generate_many
 from .pyeasyga import GeneticAlgorithm
 from .visualize import visualize
 from .__version__ import __version__
@@ -8,9 +8,10 @@ from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 from click_default_group import DefaultGroup
 
-from freqgen import amino_acid_seq, codon_frequencies
+from freqgen import amino_acid_seqs, codon_frequencies
 from freqgen import generate as _generate
 from freqgen import k_mer_frequencies
+from freqgen.freqgen import _k_mer_names_of
 from freqgen import visualize as _visualize
 
 
@@ -39,27 +40,42 @@ def freqgen():
     type=click.Path(exists=False, dir_okay=False),
     help="The output YAML file.",
 )
-def featurize(filepath, k, codon_usage, output):
-    # get the sequences as strs
-    seqs = []
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="The number of processes to count k-mers with. Use 0 for one per CPU. Defaults to 1.",
+)
+@click.option(
+    "--sparse",
+    is_flag=True,
+    help="Count and output only the k-mers that occur. Use for large k.",
+)
+def featurize(filepath, k, codon_usage, output, jobs, sparse):
+    # stream the sequences as strs, so that only one record is held in memory
     with open(filepath, "r") as handle:
-        for seq in SeqIO.parse(handle, "fasta"):
-            seq = str(seq.seq)
-            seqs.append(seq)
-
-    if k:
-        result = k_mer_frequencies(seqs, k, include_missing=True)
-    else:
-        result = {}
+        seqs = (str(record.seq) for record in SeqIO.parse(handle, "fasta"))
 
-    # get the codon usage frequencies
-    if codon_usage:
-        for seq in seqs:
-            if len(seq) % 3 != 0:
-                raise ValueError(
-                    "Cannot calculate codons for sequence whose length is not divisible by 3"
-                )
-        result["codons"] = codon_frequencies("".join(seqs))
+        if k:
+            result = k_mer_frequencies(
+                seqs,
+                k,
+                include_missing=True,
+                codons=codon_usage,
+                jobs=jobs or None,
+                sparse=sparse,
+            )
+            if sparse:  # name the k-mers that occur
+                for _k in k:
+                    indices, frequencies = result[_k]
+                    result[_k] = dict(
+                        zip(_k_mer_names_of(indices, _k), frequencies.tolist())
+                    )
+        elif codon_usage:  # get the codon usage frequencies
+            result = {"codons": codon_frequencies(seqs)}
+        else:
+            result = {}
 
     if output:
         yaml.dump(result, open(output, "w+"), default_flow_style=False)
@@ -88,6 +104,13 @@ def featurize(filepath, k, codon_usage, output):
     type=int,
     help="The length of the AA sequence (excluding stop codon) to generate if --mode=freq.",
 )
+@click.option(
+    "-n",
+    "--number",
+    type=int,
+    default=1,
+    help="The number of AA sequences to generate if --mode=freq. Defaults to 1.",
+)
 @click.option(
     "-s",
     "--stop-codon",
@@ -108,7 +131,7 @@ def featurize(filepath, k, codon_usage, output):
     type=click.Path(exists=False, dir_okay=False),
     help="The output FASTA file.",
 )
-def aa(filepath, mode, genetic_code, length, stop_codon, output, verbose):
+def aa(filepath, mode, genetic_code, length, number, stop_codon, output, verbose):
 
     # translate the DNA seq, if using exact AA seq
     if mode == "seq":
@@ -119,7 +142,7 @@ def aa(filepath, mode, genetic_code, length, stop_codon, output, verbose):
                 "Sequence is not able to be translated! Is it already an amino acid sequence?"
             )
             return
-        aa_seq = str(aa_seq).replace("*", "")
+        aa_seqs = [str(aa_seq).replace("*", "")]
 
     elif mode == "freq":
         # ensure we know how ling the new sequence should be
@@ -145,30 +168,34 @@ def aa(filepath, mode, genetic_code, length, stop_codon, output, verbose):
         seqs = "".join(seqs)
         seqs = seqs.replace("*", "")
 
-        # generate a new sequence of the right length
-        aa_seq = amino_acid_seq(length, k_mer_frequencies(seqs, 1)[1])
+        # generate new sequences of the right length
+        aa_seqs = amino_acid_seqs(number, length, k_mer_frequencies(seqs, 1)[1])
 
     # add a stop codon, if requested
     if stop_codon:
-        aa_seq += "*"
+        aa_seqs = [aa_seq + "*" for aa_seq in aa_seqs]
 
     # output to the file
     if output:
         with open(output, "w+") as output_handle:
-            if not isinstance(aa_seq, Seq):
-                aa_seq = Seq(aa_seq)
             SeqIO.write(
-                SeqRecord(
-                    aa_seq,
-                    id="Generated by Freqgen from " + str(filepath),
-                    description="",
+                (
+                    SeqRecord(
+                        Seq(aa_seq),
+                        id="Generated by Freqgen from "
+                        + str(filepath)
+                        + (" #%i" % (i + 1) if len(aa_seqs) > 1 else ""),
+                        description="",
+                    )
+                    for i, aa_seq in enumerate(aa_seqs)
                 ),
                 output_handle,
                 "fasta",
             )
 
     if verbose or not output:
-        print(aa_seq)
+        for aa_seq in aa_seqs:
+            print(aa_seq)
 
 
 @freqgen.command(help="Generate a new DNA sequence with matching features")
@@ -220,11 +247,128 @@ def aa(filepath, mode, genetic_code, length, stop_codon, output, verbose):
 )
 @click.option(
     "--mode",
-    type=click.Choice(["JSD", "ED"]),
+    type=click.Choice(["JSD", "ED", "cosine"]),
     default="ED",
-    help="The fitness function to use. Defaults to Euclidean distance.",
+    help="The fitness function to use: Jensen-Shannon divergence, Euclidean distance or cosine distance. Defaults to Euclidean distance.",
+)
+@click.option(
+    "--cache",
+    type=int,
+    default=0,
+    help="The number of fitnesses to remember by sequence, so that sequences that reappear are not evaluated again. Defaults to 0.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="The number of processes to evaluate fitness with, or to evolve islands in. Use 0 for one per CPU. Fitness is evaluated in at most one process per CPU, as each scores sequences from scratch rather than updating their scores, so it only pays off with several CPUs and large populations or long sequences. Defaults to 1.",
 )
-def generate(original, target, verbose, i, p, m, c, r, genetic_code, output, mode):
+@click.option(
+    "--islands",
+    type=int,
+    default=1,
+    help="The number of populations of size -p to evolve separately. Defaults to 1.",
+)
+@click.option(
+    "--migration-interval",
+    type=int,
+    default=10,
+    help="The number of generations between migrations between islands. Defaults to 10.",
+)
+@click.option(
+    "--migration-size",
+    type=int,
+    default=1,
+    help="The number of members to migrate from each island. Defaults to 1.",
+)
+@click.option(
+    "--optimizer",
+    type=click.Choice(["ga", "anneal", "beam"]),
+    default="ga",
+    help="How to search for the sequence: a genetic algorithm, simulated annealing or beam search. Defaults to the genetic algorithm.",
+)
+@click.option(
+    "--iterations",
+    type=int,
+    help="The number of moves for simulated annealing to propose. Defaults to 30 per codon.",
+)
+@click.option(
+    "--time-limit",
+    type=float,
+    help="The number of seconds after which to stop simulated annealing.",
+)
+@click.option(
+    "--temperature",
+    type=float,
+    help="The temperature to start simulated annealing at. Defaults to one at which a tenth of moves that worsen fitness are accepted.",
+)
+@click.option(
+    "--cooling-rate",
+    type=float,
+    help="The factor to multiply the temperature by after each move. Defaults to cooling a thousandfold over the iterations.",
+)
+@click.option(
+    "--beam-width",
+    type=int,
+    help="The number of partial sequences for beam search to keep. With another optimizer, beam search then seeds it. Defaults to 16 for beam search.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    help="The seed for the random choices, to reproduce a result.",
+)
+@click.option(
+    "--restarts",
+    type=int,
+    default=1,
+    help="The number of independent optimizations to run in the -j processes, keeping the fittest. Defaults to 1.",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(exists=False, dir_okay=False),
+    help="A file to save the genetic algorithm's progress to, so that it can be resumed.",
+)
+@click.option(
+    "--checkpoint-interval",
+    type=int,
+    default=10,
+    help="The number of generations between checkpoints. Defaults to 10.",
+)
+@click.option(
+    "--resume",
+    type=click.Path(exists=True, dir_okay=False),
+    help="A checkpoint to resume the genetic algorithm from.",
+)
+def generate(
+    original,
+    target,
+    verbose,
+    i,
+    p,
+    m,
+    c,
+    r,
+    genetic_code,
+    output,
+    mode,
+    cache,
+    jobs,
+    islands,
+    migration_interval,
+    migration_size,
+    optimizer,
+    iterations,
+    time_limit,
+    temperature,
+    cooling_rate,
+    beam_width,
+    seed,
+    restarts,
+    checkpoint,
+    checkpoint_interval,
+    resume,
+):
     optimized = _generate(
         yaml.safe_load(open(target)),
         str(SeqIO.read(original, "fasta").seq),
@@ -236,6 +380,22 @@ def generate(original, target, verbose, i, p, m, c, r, genetic_code, output, mod
         genetic_code=genetic_code,
         improvement_rel_threshold=r,
         mode=mode,
+        fitness_cache_size=cache,
+        jobs=jobs or None,
+        islands=islands,
+        migration_interval=migration_interval,
+        migration_size=migration_size,
+        optimizer=optimizer,
+        iterations=iterations,
+        time_limit=time_limit,
+        initial_temperature=temperature,
+        cooling_rate=cooling_rate,
+        beam_width=beam_width,
+        seed=seed,
+        restarts=restarts,
+        checkpoint=checkpoint,
+        checkpoint_interval=checkpoint_interval,
+        resume_from=resume,
     )
     if verbose or not output:
         print(optimized)
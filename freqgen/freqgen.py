@@ -1,4 +1,9 @@
-from collections import Counter, Iterable, defaultdict
+import copy
+import os
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Mapping
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
 from itertools import chain, islice, product
 from warnings import warn
 
@@ -6,32 +11,124 @@ import Bio.Data.CodonTable
 import numpy as np
 from Bio.Seq import Seq
 
-# create the genetic_codes and codons_for_aa dicts
-genetic_codes = {}
-codons_for_aa = {}
-synonymous_codons = {}
-
-for code_id, genetic_code in Bio.Data.CodonTable.unambiguous_dna_by_id.items():
-    # create genetic_codes dict
-    # Ex: {'TTT': 'F', 'TTC': 'F', 'TTA': 'L'...
-    table = genetic_code.forward_table
-    for codon in genetic_code.stop_codons:
-        table[codon] = "*"
-    genetic_codes[code_id] = table
-
-    # create codons_for_aa dict
-    # Ex: defaultdict(<class 'list'>, {'F': ['TTT', 'TTC']...
-    _codons_for_aa = defaultdict(list)
-    for key, value in table.items():
-        _codons_for_aa[value].append(key)
-    codons_for_aa[code_id] = dict(_codons_for_aa)
-
-    # create a list of synonymous_codons for each codon, including the original codon
-    # Ex: {'TTT': ['TTT', 'TTC']...
-    synonymous_codons[code_id] = {
-        codon: codons_for_aa[code_id][genetic_codes[code_id][codon]]
-        for codon in genetic_codes[code_id].keys()
-    }
+
+class GeneticCode(object):
+    """Lookup tables for a genetic code.
+
+    Tables are built the first time a code is used and shared from then on, so
+    use :meth:`get` rather than creating instances directly. Codons are
+    indexed 0 to 63 in alphabetical order and amino acids (including stop,
+    ``*``) in the order in which Biopython lists their codons.
+
+    Args:
+        code_id (int): The NCBI translation table number.
+
+    Attributes:
+        table (dict): Maps each codon to its amino acid. Ex: {'TTT': 'F', 'TTC': 'F', 'TTA': 'L'...
+        codons_for_aa (dict): Maps each amino acid to its codons. Ex: {'F': ['TTT', 'TTC']...
+        synonymous_codons (dict): Maps each codon to all the codons of its amino acid, including itself. Ex: {'TTT': ['TTT', 'TTC']...
+        amino_acids (tuple): The amino acids, in index order.
+        codon_amino_acids (numpy.ndarray): The index of the amino acid of each codon.
+        synonyms (numpy.ndarray): The indices of the codons, grouped by amino acid.
+        synonym_offsets (numpy.ndarray): Where each amino acid's codons start in ``synonyms``, with the total number of codons appended.
+        degeneracy (numpy.ndarray): The number of codons coding for the amino acid of each codon.
+        amino_acid_indices (numpy.ndarray): The index of each amino acid by its ASCII code, or -1 for characters that are not amino acids in this code.
+        codon_choices (numpy.ndarray): The indices of each amino acid's codons as a row, padded with -1.
+
+    Example:
+        >>> code = GeneticCode.get(11)
+        >>> code.table["ATG"]
+        'M'
+        >>> code.amino_acids[code.codon_amino_acids[14]]  # ATG
+        'M'
+        >>> code.degeneracy[30]  # CTG
+        6
+    """
+
+    _cache = {}
+
+    def __init__(self, code_id):
+        genetic_code = Bio.Data.CodonTable.unambiguous_dna_by_id[code_id]
+        self.id = code_id
+
+        self.table = dict(genetic_code.forward_table)
+        for codon in genetic_code.stop_codons:
+            self.table[codon] = "*"
+
+        _codons_for_aa = defaultdict(list)
+        for key, value in self.table.items():
+            _codons_for_aa[value].append(key)
+        self.codons_for_aa = dict(_codons_for_aa)
+        self.synonymous_codons = {
+            codon: self.codons_for_aa[self.table[codon]] for codon in self.table
+        }
+
+        self.amino_acids = tuple(self.codons_for_aa)
+        self.codon_amino_acids = np.array(
+            [self.amino_acids.index(self.table[codon]) for codon in _k_mer_names(3)],
+            dtype=np.uint8,
+        )
+        self.synonyms = np.array(
+            [
+                _k_mer_index(codon)
+                for codons in self.codons_for_aa.values()
+                for codon in codons
+            ],
+            dtype=np.int64,
+        )
+        self.synonym_offsets = np.cumsum(
+            [0] + [len(codons) for codons in self.codons_for_aa.values()]
+        )
+        self.degeneracy = np.diff(self.synonym_offsets)[self.codon_amino_acids]
+
+        # for back translation, the index of each amino acid by ASCII code and
+        # each amino acid's codons as a row, padded with -1
+        self.amino_acid_indices = np.full(256, -1, dtype=np.int64)
+        self.amino_acid_indices[[ord(aa) for aa in self.amino_acids]] = np.arange(
+            len(self.amino_acids)
+        )
+        self.codon_choices = np.full(
+            (len(self.amino_acids), self.degeneracy.max()), -1, dtype=np.int64
+        )
+        for row, (start, end) in enumerate(
+            zip(self.synonym_offsets[:-1], self.synonym_offsets[1:])
+        ):
+            self.codon_choices[row, : end - start] = self.synonyms[start:end]
+
+    @classmethod
+    def get(cls, code_id):
+        """Returns the (cached) tables for a genetic code, building them if needed."""
+        try:
+            return cls._cache[code_id]
+        except KeyError:
+            return cls._cache.setdefault(code_id, cls(code_id))
+
+
+class _GeneticCodeMapping(Mapping):
+    """A read-only mapping from each genetic code to one of its tables.
+
+    The tables are only built when a code is looked up.
+    """
+
+    def __init__(self, attribute):
+        self._attribute = attribute
+
+    def __getitem__(self, code_id):
+        return getattr(GeneticCode.get(code_id), self._attribute)
+
+    def __iter__(self):
+        return iter(Bio.Data.CodonTable.unambiguous_dna_by_id)
+
+    def __len__(self):
+        return len(Bio.Data.CodonTable.unambiguous_dna_by_id)
+
+
+# Ex: genetic_codes[11] == {'TTT': 'F', 'TTC': 'F', 'TTA': 'L'...
+genetic_codes = _GeneticCodeMapping("table")
+# Ex: codons_for_aa[11] == {'F': ['TTT', 'TTC']...
+codons_for_aa = _GeneticCodeMapping("codons_for_aa")
+# Ex: synonymous_codons[11] == {'TTT': ['TTT', 'TTC']...
+synonymous_codons = _GeneticCodeMapping("synonymous_codons")
 
 
 def amino_acid_seq(length, frequencies):
@@ -57,26 +154,78 @@ def amino_acid_seq(length, frequencies):
         >>> amino_acid_seq(25, frequencies)
     """
 
+    return amino_acid_seqs(1, length, frequencies)[0]
+
+
+def amino_acid_seqs(n, length, frequencies, array=False):
+    """Generates many amino acid sequences given frequencies of each amino acid.
+
+    All the residues are drawn in a single vectorized call, so this is much
+    faster than calling :func:`amino_acid_seq` repeatedly.
+
+    Args:
+        n (int): The number of amino acid sequences to generate.
+        length (int): The length of each amino acid sequence.
+        frequencies (dict): A dictionary containing a mapping of each amino acid to its frequency. Amino acids must be single characters if ``array`` is True.
+        array (bool, optional): Return the sequences as rows of a 2-D array of ASCII codes (``numpy.uint8``) rather than a list of strs. Defaults to False.
+
+    Note:
+        The sum of all the values in ``frequencies`` must be 1.
+
+    Returns:
+        list or numpy.ndarray: The amino acid sequences with the given frequencies.
+
+    Raises:
+        ValueError: When the number or length of the sequences is invalid or when the probabilities do not sum to 1.
+
+    Example:
+        >>> amino_acid_seqs(3, 5, {"M": 0.5, "K": 0.5})
+        ['KKKKM', 'KMKKM', 'KKKKM']
+        >>> amino_acid_seqs(2, 4, {"M": 0.5, "K": 0.5}, array=True)
+        array([[75, 75, 75, 75],
+               [77, 75, 77, 75]], dtype=uint8)
+    """
+
     if length <= 0:
         raise ValueError("Length must be a positive integer")
+    elif n <= 0:
+        raise ValueError("Number of sequences must be a positive integer")
 
-    sequence = ""
     amino_acids, frequencies = zip(*frequencies.items())
-    for i in range(length):
-        sequence += np.random.choice(amino_acids, p=frequencies)
-    return sequence
+    indices = np.random.choice(len(amino_acids), size=(n, length), p=frequencies)
+
+    if all(len(aa) == 1 and ord(aa) < 128 for aa in amino_acids):
+        # look up the ASCII code of each residue and view the rows as strs
+        codes = np.frombuffer("".join(amino_acids).encode("ascii"), dtype=np.uint8)
+        sequences = codes[indices]
+        if array:
+            return sequences
+        return [row.tobytes().decode("ascii") for row in sequences]
+
+    if array:
+        raise ValueError("Amino acids must be single ASCII characters for arrays")
+    amino_acids = np.array(amino_acids, dtype=object)
+    return ["".join(row) for row in amino_acids[indices]]
 
 
 def amino_acids_to_codons(aa_seq, codon_frequencies, genetic_code=11):
     """Generates a DNA representation of an amino acid sequence.
 
+    The codons of all the residues are sampled in one vectorized pass, so
+    passing many amino acid sequences at once is much faster than converting
+    them one by one.
+
     Args:
-        aa_seq (str): The amino acids to convert to DNA.
+        aa_seq (str, list, or numpy.ndarray): The amino acids to convert to DNA. Pass a list of strs, or a 2-D array of ASCII codes as returned by :func:`amino_acid_seqs`, to convert many sequences.
         codon_frequencies (dict): A dictionary of codon frequencies for each amino acid. For each amino acid, the sum of the frequencies of its codons must be 1.
         genetic_code (int, optional): The genetic code to use when converting to DNA. Defaults to 11, the standard genetic code.
 
     Returns:
-        str: A DNA sequence with the given codon usage.
+        str or list: A DNA sequence with the given codon usage, or a list of them if multiple amino acid sequences were given.
+
+    Raises:
+        KeyError: When an amino acid is not in the genetic code or a frequency is missing for one of its codons.
+        ValueError: When the frequencies of an amino acid's codons do not sum to 1.
 
     Example:
         >>> from Bio import SeqIO
@@ -84,27 +233,57 @@ def amino_acids_to_codons(aa_seq, codon_frequencies, genetic_code=11):
         >>> frequencies = codon_frequencies(seq)
         >>> amino_acids_to_codons("INQTEL", frequencies)
         'ATAAATCAAACCGAACTT'
+        >>> amino_acids_to_codons(["INQ", "TEL"], frequencies)
+        ['ATAAATCAA', 'ACCGAACTT']
     """
 
-    codons_dict = codons_for_aa[genetic_code]
+    batch = not isinstance(aa_seq, (str, Seq))
+    if batch and isinstance(aa_seq, np.ndarray):
+        aa_seqs = [row.tobytes().decode("ascii") for row in aa_seq]
+    else:
+        aa_seqs = [str(x) for x in aa_seq] if batch else [str(aa_seq)]
 
-    # generate the sequence
-    sequence = []
-    for aa in aa_seq:
-        try:
-            codons = codons_dict[aa]
-            sequence.append(
-                np.random.choice(
-                    codons, p=[codon_frequencies[codon] for codon in codons]
-                )
-            )
-        except KeyError:
-            pass
+    code = GeneticCode.get(genetic_code)
+    rows, codons = code.amino_acid_indices, code.codon_choices
+    names = _k_mer_names(3)
 
-    if len(sequence) != len(aa_seq):
+    # look up the given frequency of each codon of each amino acid
+    probabilities = np.zeros(codons.shape)
+    missing = np.zeros(len(codons), dtype=bool)
+    for (row, column), codon in np.ndenumerate(codons):
+        if codon >= 0:
+            try:
+                probabilities[row, column] = codon_frequencies[names[codon]]
+            except KeyError:
+                missing[row] = True
+
+    # find the row of the table for each residue
+    try:
+        residues = np.frombuffer("".join(aa_seqs).encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError:
         raise KeyError("Missing codon frequency.")
+    residues = rows[residues]
+    used = np.unique(residues)
+    if (used < 0).any() or missing[used].any():
+        raise KeyError("Missing codon frequency.")
+
+    totals = probabilities.sum(axis=1)
+    if (np.abs(totals[used] - 1) > 1e-8).any() or (probabilities[used] < 0).any():
+        raise ValueError("Codon frequencies for each amino acid must sum to 1.")
+
+    # sample each residue's codon by comparing a uniform draw to the cumulative
+    # probabilities of its codons, as np.random.choice does
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cumulative = np.cumsum(probabilities, axis=1) / totals[:, None]
+    cumulative[codons < 0] = 2  # never chosen
+    draws = np.random.random_sample(len(residues))
+    choices = (cumulative[residues] <= draws[:, None]).sum(axis=1)
+    dna = _CODON_BYTES[codons[residues, choices]].tobytes().decode("ascii")
 
-    return "".join(sequence)
+    if not batch:
+        return dna
+    ends = np.cumsum([3 * len(x) for x in aa_seqs]).tolist()
+    return [dna[start:end] for start, end in zip([0] + ends, ends)]
 
 
 def codon_frequencies(seq, mode="absolute", genetic_code=11):
@@ -114,7 +293,7 @@ def codon_frequencies(seq, mode="absolute", genetic_code=11):
     Relative mode is such that the sum of each amino acid's codons' frequencies is equal to one.
 
     Args:
-        seq (str or list): The DNA sequence(s).
+        seq (str or iterable): The DNA sequence(s). Sequences are read one at a time, so ``seq`` may be a generator.
         mode (str, optional): One of "absolute" or "relative". Defaults to "absolute"
         genetic_code (int, optional): The genetic code to use when converting to DNA. Defaults to 11, the standard genetic code.
 
@@ -194,52 +373,105 @@ def codon_frequencies(seq, mode="absolute", genetic_code=11):
          'TTT': 0.03225806451612903}
     """
 
-    if isinstance(seq, (list, tuple)):
-        for _seq in seq:
-            if (
-                len(_seq) % 3 != 0
-            ):  # check to ensure sequence contains only complete codons
-                raise ValueError("Sequence length must be divisible by 3.")
-        seq = "".join([str(seq) for seq in seq])
-
-    if len(seq) % 3 != 0:  # check to ensure sequence contains only complete codons
-        raise ValueError("Sequence length must be divisible by 3.")
-    seq = str(seq).upper()
-
-    seq = [
-        seq[i : i + 3] for i in range(0, len(seq), 3)
-    ]  # slices the sequence into individual codons
-    codon_count = Counter(seq)
-    frequencies = {
-        key: (float(value) / len(seq)) for (key, value) in codon_count.items()
-    }
-
-    # collections.Counter returns a dictionary with counts of all the codons
-    # present. To ensure a 64-D vector, we make sure all codons are present in
-    # the dictionary.
-    for codon in genetic_codes[genetic_code]:
-        try:
-            frequencies[codon]
-        except KeyError:
-            frequencies[codon] = 0
-    if mode == "absolute":
-        return frequencies
+    if isinstance(seq, (str, bytes, Seq)):
+        seq = [seq]
 
-    if mode == "relative":
-        relative = {}
-        for i in synonymous_codons[genetic_code].keys():
-            try:
-                relative[i] = frequencies[i] / sum(
-                    (frequencies[codon] for codon in synonymous_codons[genetic_code][i])
-                )  # divide the occurence of a codon by the total number of its synonyms
-            except ZeroDivisionError:
-                relative[i] = 1 / len(
-                    synonymous_codons[genetic_code][i]
+    # count the codons one sequence at a time, so that seq may be any iterable
+    codon_count = _CodonCounts()
+    for _seq in seq:
+        codon_count.add(_seq)
+
+    return codon_count.frequencies(mode=mode, genetic_code=genetic_code)
+
+
+class _CodonCounts(object):
+    """Running codon counts, filled one sequence at a time.
+
+    Codons made up of ACGT are counted in a dense array in alphabetical order,
+    others by name.
+    """
+
+    def __init__(self):
+        self._counts = np.zeros(64, dtype=np.int64)
+        self._extra = Counter()
+
+    def add(self, seq):
+        """Adds the codons of a single sequence to the counts.
+
+        Raises:
+            ValueError: When the sequence length is not divisible by three.
+        """
+        if len(seq) % 3 != 0:  # check to ensure sequence contains only complete codons
+            raise ValueError("Sequence length must be divisible by 3.")
+        seq = seq.decode("ascii") if isinstance(seq, bytes) else str(seq)
+
+        codes = _encode(seq)
+        if codes is None:  # not ASCII, so count the codons by name
+            seq = seq.upper()
+            for codon in (seq[i : i + 3] for i in range(0, len(seq), 3)):
+                if all(base in _BASES for base in codon):
+                    self._counts[_k_mer_index(codon)] += 1
+                else:
+                    self._extra[codon] += 1
+            return
+
+        # view the sequence as rows of codons
+        codes = codes.reshape(-1, 3)
+        invalid = (codes == 4).any(axis=1)
+        if invalid.any():
+            upper = seq.upper()
+            self._extra.update(
+                upper[3 * i : 3 * i + 3] for i in np.flatnonzero(invalid)
+            )
+            codes = codes[~invalid]
+        indices = codes[:, 0] * 16 + codes[:, 1] * 4 + codes[:, 2]
+        self._counts += np.bincount(indices, minlength=64)
+
+    def __iadd__(self, other):
+        """Merges the counts of another instance."""
+        self._counts += other._counts
+        self._extra.update(other._extra)
+        return self
+
+    def __isub__(self, other):
+        """Removes the counts of another instance."""
+        self._counts -= other._counts
+        self._extra.subtract(other._extra)
+        self._extra += Counter()  # drop codons that are no longer counted
+        return self
+
+    def counts(self):
+        """Returns the dense codon counts and the counts of non-DNA codons."""
+        return self._counts, self._extra
+
+    def frequencies(self, mode="absolute", genetic_code=11):
+        """Normalizes the counts into frequencies. See :func:`codon_frequencies`."""
+        if mode == "absolute":
+            total = int(self._counts.sum()) + sum(self._extra.values())
+            frequencies = {
+                codon: (count / total if count else 0)
+                for codon, count in zip(_k_mer_names(3), self._counts.tolist())
+            }
+            frequencies.update(
+                (codon, count / total) for codon, count in self._extra.items()
+            )
+            return frequencies
+
+        if mode == "relative":
+            # divide the occurence of a codon by the total number of its synonyms
+            code = GeneticCode.get(genetic_code)
+            synonyms = np.bincount(code.codon_amino_acids, weights=self._counts)
+            synonyms = synonyms[code.codon_amino_acids]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                relative = np.where(
+                    synonyms > 0,
+                    self._counts / synonyms,
+                    1 / code.degeneracy,
                 )  # if an amino acid is never used in the reference set, then all its codons are used equally
-        return relative
+            return dict(zip(_k_mer_names(3), relative.tolist()))
 
-    else:
-        raise ValueError("Mode must be either absolute or relative.")
+        else:
+            raise ValueError("Mode must be either absolute or relative.")
 
 
 def k_mers(seq, k):
@@ -287,18 +519,526 @@ def k_mers(seq, k):
         yield "".join(result)
 
 
+# 2-bit code of each byte value: A=0, C=1, G=2, T=3. Anything else is mapped to 4
+# so that k-mers containing it can be set aside and counted by name instead.
+_BASES = "ACGT"
+_BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate(_BASES):
+    _BASE_CODES[ord(_base)] = _BASE_CODES[ord(_base.lower())] = _code
+
+
+def _encode(seq):
+    """Encodes a sequence as an array of 2-bit base codes.
+
+    Returns None if the sequence cannot be viewed as one byte per character.
+    """
+    try:
+        raw = np.frombuffer(seq.encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return None
+    return _BASE_CODES[raw]
+
+
+def _k_mer_indices(codes, k):
+    """Computes the rolling base-4 index of every *k*-mer in an encoded sequence.
+
+    The index of a *k*-mer is its position in the alphabetical ordering of all
+    4 :sup:`k` DNA *k*-mers, i.e. the order used by ``vector=True``. Several
+    sequences of the same length may be encoded as the rows of a 2-D array.
+    """
+    n = codes.shape[-1] - k + 1
+    indices = codes[..., :n].astype(np.uint32 if k <= 16 else np.int64)
+    for offset in range(1, k):
+        indices <<= 2
+        indices += codes[..., offset : offset + n]
+    return indices
+
+
+def _k_mer_index(k_mer):
+    """Returns the base-4 index of a DNA *k*-mer string."""
+    index = 0
+    for base in k_mer:
+        index = index * 4 + _BASES.index(base)
+    return index
+
+
+@lru_cache(maxsize=None)
+def _k_mer_names(k):
+    """Returns all DNA *k*-mers in index (alphabetical) order."""
+    return tuple("".join(x) for x in product(_BASES, repeat=k))
+
+
+# the bytes of each codon, in alphabetical order
+_CODON_BYTES = np.frombuffer(
+    "".join(_k_mer_names(3)).encode("ascii"), dtype=np.uint8
+).reshape(64, 3)
+
+# the 2-bit base codes of each codon, in alphabetical order
+_CODON_CODES = _BASE_CODES[_CODON_BYTES]
+
+
+def _k_mer_names_of(indices, k):
+    """Returns the DNA *k*-mers with the given indices."""
+    shifts = 2 * np.arange(k - 1, -1, -1)
+    codes = (np.asarray(indices, dtype=np.int64)[:, None] >> shifts) & 3
+    return ["".join(_BASES[code] for code in row) for row in codes.tolist()]
+
+
+def _dna_k_mer_indices(seq, k, extra=None):
+    """Computes the indices of the DNA *k*-mers of a single sequence.
+
+    Args:
+        seq (str): The sequence.
+        k (int): The length of the *k*-mers.
+        extra (collections.Counter, optional): If given, *k*-mers containing characters other than ACGT are counted in it by name. Updated in place.
+
+    Returns:
+        numpy.ndarray: The index (see :func:`_k_mer_index`) of each *k*-mer made up only of ACGT.
+    """
+    # error checking, consistent with k_mers
+    if k > len(seq):
+        raise ValueError(
+            "k (%i) may not be less then length of seq (%i)." % (k, len(seq))
+        )
+
+    codes = _encode(seq)
+    if codes is None:  # not ASCII, so count the k-mers by name
+        indices = []
+        for k_mer in k_mers(seq.upper(), k):
+            if all(base in _BASES for base in k_mer):
+                indices.append(_k_mer_index(k_mer))
+            elif extra is not None:
+                extra[k_mer] += 1
+        return np.array(indices, dtype=np.int64)
+
+    invalid = codes == 4
+    if not invalid.any():
+        return _k_mer_indices(codes, k)
+
+    # find the k-mers spanning a non-ACGT character and count them by name
+    spans = np.concatenate(([0], np.cumsum(invalid)))
+    spans = spans[k:] - spans[: len(spans) - k]
+    if extra is not None:
+        upper = seq.upper()
+        extra.update(upper[i : i + k] for i in np.flatnonzero(spans))
+    codes = np.where(invalid, 0, codes).astype(np.uint8)
+    return _k_mer_indices(codes, k)[spans == 0]
+
+
+class _SparseCounts(object):
+    """Counts of *k*-mer indices, stored as sorted arrays of indices and counts.
+
+    Counts are buffered and merged in batches, so that adding many small
+    sequences does not repeatedly merge the full set of distinct *k*-mers.
+    """
+
+    def __init__(self):
+        self._indices = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._pending = []
+        self._pending_size = 0
+
+    def add(self, indices, counts=None):
+        """Adds indices, or unique indices with their counts."""
+        if counts is None:
+            indices, counts = np.unique(indices, return_counts=True)
+        self._pending.append((indices, counts))
+        self._pending_size += len(indices)
+        if self._pending_size > 2**22:
+            self._merge()
+
+    def _merge(self):
+        if not self._pending:
+            return
+        indices = np.concatenate([self._indices] + [x[0] for x in self._pending])
+        counts = np.concatenate([self._counts] + [x[1] for x in self._pending])
+        self._indices, inverse = np.unique(indices, return_inverse=True)
+        self._counts = np.bincount(
+            inverse.ravel(), weights=counts, minlength=len(self._indices)
+        ).astype(np.int64)
+        present = self._counts != 0
+        self._indices, self._counts = self._indices[present], self._counts[present]
+        self._pending = []
+        self._pending_size = 0
+
+    def __iadd__(self, other):
+        self.add(*other.items())
+        return self
+
+    def __isub__(self, other):
+        indices, counts = other.items()
+        self.add(indices, -counts)
+        return self
+
+    def items(self):
+        """Returns the sorted indices and their counts."""
+        self._merge()
+        return self._indices, self._counts
+
+
+class _KMerCounts(object):
+    """Running *k*-mer counts for several values of *k*, filled in one pass.
+
+    Only the largest *k* (:math:`K`) is counted directly. Every smaller *k*-mer
+    of a sequence is the prefix of one of its :math:`K`-mers, except for those
+    starting in its last :math:`K - 1` bases, so the smaller counts are derived
+    by marginalizing the :math:`K`-mer counts and adding the *k*-mers of each
+    sequence's tail. Sequences containing characters other than ACGT are
+    counted separately for each *k*.
+
+    Args:
+        k (list): The values of *k* to count.
+        sparse (bool, optional): Whether to store counts as :class:`_SparseCounts` rather than dense arrays of all 4 :sup:`k` *k*-mers. *k*-mers containing characters other than ACGT are then skipped. Defaults to False.
+    """
+
+    def __init__(self, k, sparse=False):
+        self.k = sorted(k)
+        self.sparse = sparse
+        if sparse and self.k[-1] > 31:
+            raise ValueError("Sparse k-mer counts only support k <= 31.")
+
+        self._counts = {_k: self._empty(_k) for _k in self.k}
+        self._extra = {_k: Counter() for _k in self.k}
+
+        # counts of the longest k-mers that are yet to be marginalized
+        self._longest = self._empty(self.k[-1])
+
+    def _empty(self, k):
+        return _SparseCounts() if self.sparse else np.zeros(4**k, dtype=np.int64)
+
+    def _add(self, counts, indices, k):
+        if self.sparse:
+            counts.add(indices)
+        else:
+            counts += np.bincount(indices, minlength=4**k)
+
+    def add(self, seq):
+        """Adds the *k*-mers of a single sequence to the counts."""
+        seq = seq.decode("ascii") if isinstance(seq, bytes) else str(seq)
+
+        # error checking, consistent with k_mers
+        for _k in self.k:
+            if _k > len(seq):
+                raise ValueError(
+                    "k (%i) may not be less then length of seq (%i)." % (_k, len(seq))
+                )
+
+        codes = _encode(seq)
+        if len(self.k) == 1 or codes is None or (codes == 4).any():
+            for _k in self.k:
+                extra = None if self.sparse else self._extra[_k]
+                self._add(self._counts[_k], _dna_k_mer_indices(seq, _k, extra), _k)
+            return
+
+        longest = self.k[-1]
+        self._add(self._longest, _k_mer_indices(codes, longest), longest)
+        tail = codes[len(codes) - longest + 1 :]
+        for _k in self.k[:-1]:
+            if self.sparse:
+                self._counts[_k].add(_k_mer_indices(tail, _k))
+            else:
+                np.add.at(self._counts[_k], _k_mer_indices(tail, _k), 1)
+
+    def __iadd__(self, other):
+        """Merges the counts of another instance for the same values of *k*."""
+        for _k in self.k:
+            self._counts[_k] += other._counts[_k]
+            self._extra[_k].update(other._extra[_k])
+        self._longest += other._longest
+        return self
+
+    def __isub__(self, other):
+        """Removes the counts of another instance for the same values of *k*."""
+        for _k in self.k:
+            self._counts[_k] -= other._counts[_k]
+            self._extra[_k].subtract(other._extra[_k])
+            self._extra[_k] += Counter()  # drop k-mers that are no longer counted
+        self._longest -= other._longest
+        return self
+
+    def counts(self, k):
+        """Returns the counts and the counts of non-DNA *k*-mers for *k*.
+
+        The counts are a dense array or, if sparse, a tuple of sorted indices
+        and their counts.
+        """
+        if not self.sparse:
+            marginal = self._longest.reshape(4**k, -1).sum(axis=1)
+            return self._counts[k] + marginal, self._extra[k]
+
+        indices, counts = self._longest.items()
+        marginal = _SparseCounts()
+        marginal.add(*self._counts[k].items())
+        marginal.add(indices >> (2 * (self.k[-1] - k)), counts)
+        return marginal.items(), self._extra[k]
+
+
+def _count_chunk(seqs, k, codons=False, sparse=False):
+    """Counts some sequences into a new :class:`FrequencyProfile`."""
+    return FrequencyProfile(k, codons=codons, sparse=sparse).update(seqs)
+
+
+def _chunks(seqs, size=2**20):
+    """Groups sequences into lists spanning at least ``size`` characters."""
+    chunk, length = [], 0
+    for seq in seqs:
+        chunk.append(seq)
+        length += len(seq)
+        if length >= size:
+            yield chunk
+            chunk, length = [], 0
+    if chunk:
+        yield chunk
+
+
+class FrequencyProfile(object):
+    """Raw *k*-mer and codon counts of a set of sequences.
+
+    Unlike :func:`k_mer_frequencies`, which normalizes its counts straight
+    away, a profile keeps integer counts, so profiles can be combined and
+    updated incrementally and only normalized into frequencies when needed.
+    Profiles counting the same values of *k* (and, if any, codons) can be
+    added and subtracted; subtracting sequences that were never added leaves
+    negative counts.
+
+    Args:
+        k (int or list, optional): The length of the *k*-mer(s) to count. Defaults to none.
+        codons (bool, optional): Whether to count codons. Defaults to False.
+        sparse (bool, optional): Whether to count only the *k*-mers that occur. See :func:`k_mer_frequencies`. Defaults to False.
+
+    Raises:
+        ValueError: When an invalid value of k is provided.
+
+    Example:
+        >>> reference = FrequencyProfile([1, 2]).update(["GATGATGGC", "ATGTAA"])
+        >>> reference.sequences
+        2
+        >>> reference.counts(1)
+        array([5, 1, 5, 4])
+        >>> reference -= FrequencyProfile([1, 2]).update("ATGTAA")
+        >>> reference.frequencies(include_missing=False)
+        {1: {'A': 0.2222222222222222,
+             'C': 0.1111111111111111,
+             'G': 0.4444444444444444,
+             'T': 0.2222222222222222},
+         2: {'AT': 0.25, 'GA': 0.25, 'GC': 0.125, 'GG': 0.125, 'TG': 0.25}}
+    """
+
+    def __init__(self, k=(), codons=False, sparse=False):
+        # ensure there is a list of k values, even if it only has one element
+        self.k = sorted(k) if isinstance(k, Iterable) else [k]
+        for _k in self.k:
+            if _k < 1:
+                raise ValueError("Invalid value of k. May not be less than 1.")
+
+        self.codons = codons
+        self.sparse = sparse
+        self.sequences = 0  # the number of sequences counted
+        self._k_mers = _KMerCounts(self.k, sparse=sparse) if self.k else None
+        self._codons = _CodonCounts() if codons else None
+
+    def update(self, seqs, jobs=1):
+        """Adds the counts of more sequences to the profile.
+
+        Args:
+            seqs (str or iterable): The sequence(s) to count. Sequences are read one at a time, so ``seqs`` may be a generator.
+            jobs (int, optional): The number of worker processes across which to split the sequences. See :func:`k_mer_frequencies`. Defaults to 1.
+
+        Returns:
+            FrequencyProfile: The profile itself.
+        """
+        if isinstance(seqs, (str, bytes, Seq)):
+            seqs = [seqs]
+
+        if jobs != 1:
+            return self._update_parallel(seqs, jobs)
+
+        for seq in seqs:
+            if self._k_mers is not None:
+                self._k_mers.add(seq)
+            if self._codons is not None:
+                self._codons.add(seq)
+            self.sequences += 1
+        return self
+
+    def _update_parallel(self, seqs, jobs=None):
+        """Like :meth:`update`, but splits the sequences across processes.
+
+        At most two chunks per worker are read ahead of the workers, so memory
+        use stays bounded when ``seqs`` is a generator.
+        """
+        jobs = jobs or os.cpu_count()
+        with ProcessPoolExecutor(jobs) as executor:
+            pending, done = set(), set()
+            for chunk in chain(_chunks(seqs), [None]):
+                if chunk is None:  # all chunks submitted, so wait for the rest
+                    done, pending = pending, set()
+                elif len(pending) >= 2 * jobs:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                # merge the counts of finished chunks
+                for future in done:
+                    self += future.result()
+                done = set()
+
+                if chunk is not None:
+                    pending.add(
+                        executor.submit(
+                            _count_chunk, chunk, self.k, self.codons, self.sparse
+                        )
+                    )
+        return self
+
+    def _check_compatible(self, other):
+        if (self.k, self.codons, self.sparse) != (other.k, other.codons, other.sparse):
+            raise ValueError(
+                "Profiles must count the same values of k, codons and sparsity."
+            )
+
+    def __iadd__(self, other):
+        self._check_compatible(other)
+        if self._k_mers is not None:
+            self._k_mers += other._k_mers
+        if self._codons is not None:
+            self._codons += other._codons
+        self.sequences += other.sequences
+        return self
+
+    def __isub__(self, other):
+        self._check_compatible(other)
+        if self._k_mers is not None:
+            self._k_mers -= other._k_mers
+        if self._codons is not None:
+            self._codons -= other._codons
+        self.sequences -= other.sequences
+        return self
+
+    def __add__(self, other):
+        result = copy.deepcopy(self)
+        result += other
+        return result
+
+    def __sub__(self, other):
+        result = copy.deepcopy(self)
+        result -= other
+        return result
+
+    def counts(self, k):
+        """Returns the raw counts of the DNA *k*-mers or codons.
+
+        Args:
+            k (int or str): The length of the *k*-mers, or ``"codons"``.
+
+        Returns:
+            numpy.ndarray or tuple: The counts of all 4 :sup:`k` *k*-mers (or 64 codons) in alphabetical order or, if sparse, a tuple of the sorted indices of the *k*-mers present and their counts.
+
+        Raises:
+            ValueError: If the profile does not count ``k``, or codons.
+        """
+        if k == "codons":
+            if not self.codons:
+                raise ValueError("The profile does not count codons.")
+            return self._codons.counts()[0]
+        if k not in self.k:
+            raise ValueError("The profile does not count k-mers of length %s." % k)
+        return self._k_mers.counts(k)[0]
+
+    def frequencies(self, include_missing=True, vector=False, genetic_code=11):
+        """Normalizes the counts into frequencies.
+
+        Args:
+            include_missing (bool, optional): If True, include missing *k*-mers as having a frequency of 0. Defaults to True.
+            vector (bool, optional): Return a 1-D Numpy array of the *k*-mer frequencies, ordered by *k*-mers alphabetically, omitting codons. Defaults to False.
+            genetic_code (int, optional): The genetic code used to name the codons. Defaults to 11, the standard genetic code.
+
+        Returns:
+            dict: The frequencies, in the format returned by :func:`k_mer_frequencies`.
+
+        Raises:
+            ValueError: When ``include_missing`` is False and ``vector`` is True, or ``vector`` is True for a sparse profile.
+        """
+        if not include_missing and vector:
+            raise ValueError("May not create vector without including missing kmers.")
+        elif self.sparse and vector:
+            raise ValueError("Cannot vectorize sparse k-mer frequencies.")
+
+        output = {}
+        for _k in self.k:
+            if self.sparse:
+                (indices, counts), _ = self._k_mers.counts(_k)
+                output[_k] = (indices, counts / counts.sum())
+            else:
+                output[_k] = _frequencies(
+                    *self._k_mers.counts(_k),
+                    _k,
+                    include_missing=include_missing,
+                    vector=vector
+                )
+
+        if vector:
+            return np.array(list(chain.from_iterable([output[_k] for _k in self.k])))
+
+        if self.codons:
+            output["codons"] = self.codon_frequencies(genetic_code=genetic_code)
+        return output
+
+    def codon_frequencies(self, mode="absolute", genetic_code=11):
+        """Normalizes the codon counts into frequencies.
+
+        See :func:`codon_frequencies` for the arguments and return value.
+        """
+        return self._codons.frequencies(mode=mode, genetic_code=genetic_code)
+
+
+def _frequencies(counts, extra, k, include_missing=True, vector=False):
+    """Normalizes dense and non-DNA *k*-mer counts into frequencies."""
+    total = int(counts.sum()) + sum(extra.values())
+    if vector and not extra:
+        return counts / total
+
+    if include_missing:
+        frequencies = {
+            k_mer: (count / total if count else 0)
+            for k_mer, count in zip(_k_mer_names(k), counts.tolist())
+        }
+    else:
+        names = _k_mer_names(k)
+        present = np.flatnonzero(counts)
+        frequencies = {
+            names[index]: count / total
+            for index, count in zip(present.tolist(), counts[present].tolist())
+        }
+    frequencies.update((k_mer, count / total) for k_mer, count in extra.items())
+
+    if vector:
+        frequencies = sorted(list(frequencies.items()), key=lambda x: x[0])
+        frequencies = np.fromiter(
+            (x[1] for x in frequencies), float, count=len(frequencies)
+        )
+    return frequencies
+
+
 def k_mer_frequencies(
-    seq, k, include_missing=True, vector=False, codons=False, genetic_code=11
+    seq,
+    k,
+    include_missing=True,
+    vector=False,
+    codons=False,
+    genetic_code=11,
+    jobs=1,
+    sparse=False,
 ):
     """Calculates relative frequencies of each *k*-mer in the sequence.
 
     Args:
-        seq (str or list): The sequence(s) to for which to generate *k*-mer frequencies.
+        seq (str or iterable): The sequence(s) to for which to generate *k*-mer frequencies. Sequences are read one at a time, so ``seq`` may be a generator.
         k (int or list): the length of the *k*-mer(s).
         include_missing (bool, optional): If True, include missing *k*-mers as having a frequency of 0. Only supports DNA *k*-mers. Defaults to False.
         vector (bool, optional): Return a 1-D Numpy array of the *k*-mer frequencies, ordered by *k*-mers alphabetically. If True, ``include_missing`` must also be True. Defaults to False.
         codons (bool, optional): Whether to include a codon usage entry in the resulting dictionary. Defaults to False.
         genetic_code (int, optional): The genetic code to use when converting to DNA. Defaults to 11, the standard genetic code.
+        jobs (int, optional): The number of worker processes across which to split the sequences. Each worker counts a chunk of the sequences and the integer counts are merged, so the result is identical to the serial one. Defaults to 1, i.e. counting in this process. Use None for one worker per CPU.
+        sparse (bool, optional): Count only the *k*-mers that occur, so that memory use is bounded by the length of the sequences rather than 4 :sup:`k`. Each *k* then maps to a tuple of two arrays: the sorted indices of the *k*-mers present (their positions in the alphabetical ordering of all DNA *k*-mers) and their frequencies. *k*-mers containing characters other than ACGT are skipped and ``include_missing`` is ignored. Supports *k* up to 31. Defaults to False.
 
     Returns:
         dict: A dict in which the keys are *k* values and the values are dictionaries mapping *k*-mers to floats of their frequencies.
@@ -306,6 +1046,7 @@ def k_mer_frequencies(
     Raises:
         ValueError: When an invalid value of k is provided or ``include_missing`` is False and ``vector`` is True.
         ValueError: When ``codons`` and ``vector`` are both True.
+        ValueError: When ``sparse`` and ``vector`` are both True.
         ValueError: When ``k`` or ``seq`` is not provided.
 
     Example:
@@ -358,52 +1099,78 @@ def k_mer_frequencies(
         raise ValueError("Must provide seq(s)")
     elif codons and vector:
         raise ValueError("Cannot vectorize codons.")
+    elif sparse and vector:
+        raise ValueError("Cannot vectorize sparse k-mer frequencies.")
+
+    # count the k-mers (and codons) of each seq in a single pass over the seqs,
+    # so that seq may be a generator streaming records from a file. Only the
+    # largest k is counted directly; the rest are derived from it.
+    profile = FrequencyProfile(k, codons=codons, sparse=sparse).update(seq, jobs=jobs)
+    if not profile.sequences:
+        raise ValueError("Must provide seq(s)")
 
-    # ensure there is a list of k values, even if it only has one element
-    if not isinstance(k, Iterable):
-        k = [k]
-    else:
-        k = sorted(k)
+    # determine their frequencies
+    return profile.frequencies(
+        include_missing=include_missing, vector=vector, genetic_code=genetic_code
+    )
 
-    output = {}
 
-    # ditto for sequence(s)
-    if isinstance(seq, (str, bytes, Seq)):
-        seq = [seq]
+def _jsd_terms(p, q):
+    """Computes the elementwise terms of the Jensen-Shannon divergence, in bits.
 
-    for _k in k:
+    The divergence is the sum of the terms, which are 0 wherever both ``p``
+    and ``q`` are, and otherwise depend only on that element of each.
+    """
+    m = (p + q) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(p > 0, p * np.log2(p / m), 0) + np.where(
+            q > 0, q * np.log2(q / m), 0
+        )
+    return terms / 2
 
-        # check the value of k
-        if _k < 1:
-            raise ValueError("Invalid value of k. May not be less than 1.")
 
-        # get all the k-mers for the seqs
-        _seqs = []
-        for _seq in [list(k_mers(_seq.upper(), _k)) for _seq in seq]:
-            _seqs.extend(_seq)
+def _normalize(x):
+    """Scales counts or frequencies to sum to 1 along the last axis."""
+    x = np.asarray(x, dtype=float)
+    return x / x.sum(axis=-1, keepdims=True)
 
-        # determine their frequencies
-        count = Counter(_seqs)
-        total_k_mer_count = sum(count.values())
-        frequencies = {
-            k_mer: value / total_k_mer_count for k_mer, value in count.items()
-        }
 
-        if include_missing:
-            defaults = {"".join(x): 0 for x in product("ATGC", repeat=_k)}
-            frequencies = {**defaults, **frequencies}
-        if vector:
-            frequencies = sorted(list(frequencies.items()), key=lambda x: x[0])
-            frequencies = np.fromiter(
-                (x[1] for x in frequencies), float, count=len(frequencies)
-            )
-        output[_k] = frequencies
+def jensen_shannon_divergence(p, q):
+    """Calculates the Jensen-Shannon divergence between two distributions.
+
+    Args:
+        p (numpy.ndarray): Counts or frequencies, which are normalized to sum to 1. If 2-D, each row is a distribution.
+        q (numpy.ndarray): Counts or frequencies to compare to, in the same layout as ``p``.
+
+    Returns:
+        float or numpy.ndarray: The divergence in bits, from 0 for identical distributions to 1 for those with no elements in common, or one for each row.
+
+    Example:
+        >>> jensen_shannon_divergence([1, 0], [0, 1])
+        1.0
+        >>> jensen_shannon_divergence([[1, 1], [3, 1]], [1, 1])
+        array([0.        , 0.04879494])
+    """
+    return _jsd_terms(_normalize(p), _normalize(q)).sum(axis=-1)
 
-    if vector:
-        return np.array(list(chain.from_iterable([output[_k] for _k in k])))
 
-    # syntactic sugar to make capturing codon usage easier
-    if codons:
-        output["codons"] = codon_frequencies(seq, genetic_code=genetic_code)
+def cosine_distance(p, q):
+    """Calculates the cosine distance between two vectors.
 
-    return output
+    Args:
+        p (numpy.ndarray): Counts or frequencies. If 2-D, each row is a vector.
+        q (numpy.ndarray): Counts or frequencies to compare to, in the same layout as ``p``.
+
+    Returns:
+        float or numpy.ndarray: One minus the cosine of the angle between the vectors, from 0 for proportional vectors to 1 for those with no elements in common, or one for each row.
+
+    Example:
+        >>> cosine_distance([1, 0], [0, 1])
+        1.0
+        >>> cosine_distance([1, 2], [2, 4])
+        0.0
+    """
+    p, q = np.asarray(p, dtype=float), np.asarray(q, dtype=float)
+    return 1 - np.sum(p * q, axis=-1) / np.sqrt(
+        np.sum(p**2, axis=-1) * np.sum(q**2, axis=-1)
+    )
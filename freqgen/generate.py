@@ -1,53 +1,1009 @@
-import random
+import numbers
+import time
+from concurrent.futures import as_completed
+from collections import defaultdict
 from warnings import warn
 from math import isclose
 
-import dit
 import numpy as np
-import yaml
-from Bio.Seq import Seq
-from dit.divergences import jensen_shannon_divergence
 
 from .freqgen import *
-from .pyeasyga import GeneticAlgorithm
-
-
-def dna_to_vector(seq):
-    seq = np.array(list(seq))
-    seq[seq == "T"] = 0
-    seq[seq == "C"] = 1
-    seq[seq == "A"] = 2
-    seq[seq == "G"] = 3
-    seq = seq.astype(int)
-    seq = [np.binary_repr(x, width=2) for x in seq]
-    seq = [list(x) for x in seq]
-    seq = np.array(seq).flatten().astype(int)
-    return seq
-
-
-def vector_to_dna(vector):
-    dna = "".join(np.array(vector).astype(str))
-    dna = np.array([dna[i : i + 2] for i in range(0, len(dna), 2)])
-    dna[dna == "00"] = "T"
-    dna[dna == "01"] = "C"
-    dna[dna == "10"] = "A"
-    dna[dna == "11"] = "G"
-    return "".join(dna)
-
-
-def _synonymous_codons(genetic_code_dict):  # from CAI source code
-    # invert the genetic code dictionary to map each amino acid to its codons
-    codons_for_amino_acid = {}
-    for codon, amino_acid in genetic_code_dict.items():
-        codons_for_amino_acid[amino_acid] = codons_for_amino_acid.get(amino_acid, [])
-        codons_for_amino_acid[amino_acid].append(codon)
-
-    # create dictionary of synonmyous codons
-    # Example: {'CTT': ['CTT', 'CTG', 'CTA', 'CTC', 'TTA', 'TTG'], 'ATG': ['ATG']...}
-    return {
-        codon: codons_for_amino_acid[genetic_code_dict[codon]]
-        for codon in genetic_code_dict.keys()
+from .freqgen import (
+    _BASES,
+    _CODON_BYTES,
+    _CODON_CODES,
+    _encode,
+    _k_mer_index,
+    _k_mer_indices,
+    _jsd_terms,
+)
+from .pyeasyga import ArrayGeneticAlgorithm, shared_executor
+
+
+def dna_to_codons(seq):
+    """Converts a DNA sequence into an array of codon indices.
+
+    This is the genome representation used by :func:`generate`. The index of a
+    codon is its position in the alphabetical ordering of all 64 codons.
+
+    Args:
+        seq (str): The DNA sequence, made up of whole codons.
+
+    Returns:
+        numpy.ndarray: The index of each codon, as ``uint8``.
+
+    Raises:
+        ValueError: If ``seq`` is not made up of whole codons of A, C, G, and T.
+
+    Example:
+        >>> dna_to_codons("AAATTT")
+        array([ 0, 63], dtype=uint8)
+    """
+    codes = _encode(seq)
+    if codes is None or len(codes) % 3 or (codes > 3).any():
+        raise ValueError("Sequence must be made up of whole codons of A, C, G, and T.")
+    codes = codes.reshape(-1, 3)
+    return codes[:, 0] * 16 + codes[:, 1] * 4 + codes[:, 2]
+
+
+def codons_to_dna(codons):
+    """Converts an array of codon indices back into a DNA sequence.
+
+    Args:
+        codons (numpy.ndarray): The index of each codon (see :func:`dna_to_codons`).
+
+    Returns:
+        str: The DNA sequence.
+
+    Example:
+        >>> codons_to_dna(np.array([0, 63], dtype=np.uint8))
+        'AAATTT'
+    """
+    return _CODON_BYTES[np.asarray(codons)].tobytes().decode("ascii")
+
+
+def _random_synonyms(code, codons, rng):
+    """Chooses a different synonymous codon for each of an array of codons.
+
+    Every codon must have at least one synonym, i.e. a degeneracy above 1.
+    The choices are drawn from ``rng``, a :class:`numpy.random.Generator`.
+    """
+    choices = code.codon_choices[code.codon_amino_acids[codons]]
+    current = np.argmax(choices == codons[:, None], axis=1)
+    picks = (rng.random(len(codons)) * (code.degeneracy[codons] - 1)).astype(np.int64)
+    picks += picks >= current  # skip over the current codon
+    return choices[np.arange(len(codons)), picks].astype(np.uint8)
+
+
+def _delta_table(length, k, codons):
+    """Builds the table used to update an individual's *k*-mers as codons change.
+
+    An individual's *k*-mers are listed in one array: all its *k*-mers in order
+    for each *k* in turn, then its codons if ``codons``, then one spare slot.
+
+    Args:
+        length (int): The length of the genomes, in codons.
+        k (list): The values of *k*.
+        codons (bool): Whether codons are listed too.
+
+    Returns:
+        tuple: For each codon, the slots of the array holding the *k*-mers that overlap it, padded with the spare slot, and how much each of the codon's three bases adds to the index (see :func:`_k_mer_index`) of each of those *k*-mers. Shaped (length, width) and (length, width, 3).
+    """
+    positions = 3 * np.arange(length)[:, None]
+    slots, shifts, block = [], [], 0
+    for _k in k:
+        n = 3 * length - _k + 1
+        starts = positions + np.arange(1 - _k, 3)
+        valid = (starts >= 0) & (starts < n)
+        slots.append(np.where(valid, block + starts, -1))
+
+        # the position of each base of the codon within each k-mer
+        offsets = positions[:, :, None] + np.arange(3) - starts[:, :, None]
+        valid = valid[:, :, None] & (offsets >= 0) & (offsets < _k)
+        shifts.append(np.where(valid, 4 ** (_k - 1 - np.clip(offsets, 0, _k - 1)), 0))
+        block += n
+    if codons:
+        slots.append(block + np.arange(length)[:, None])
+        shifts.append(np.broadcast_to([[[16, 4, 1]]], (length, 1, 3)))
+        block += length
+    slots = np.concatenate([np.zeros((length, 0), dtype=np.int64)] + slots, axis=1)
+    slots[slots < 0] = block  # the spare slot
+    shifts = np.concatenate([np.zeros((length, 0, 3), dtype=np.int64)] + shifts, axis=1)
+    return slots, shifts
+
+
+# the largest number of possible k-mers for which to compare k-mer frequencies
+# as dense vectors, i.e. k <= 8
+_MAX_DENSE_K_MERS = 4**8
+
+
+def _sparse_target(frequencies, k):
+    """Converts a dict of target *k*-mer frequencies into sorted sparse arrays.
+
+    As for the dense target, *k*-mers with other bases than A, C, G, and T
+    (e.g. N, as counted by :func:`~freqgen.k_mer_frequencies`) are left out,
+    since no generated sequence contains them.
+    """
+    if any(len(k_mer) != k for k_mer in frequencies):
+        raise ValueError(
+            "Targets for k=%i may only contain k-mers of length %i" % (k, k)
+        )
+    frequencies = {
+        k_mer: x
+        for k_mer, x in frequencies.items()
+        if x and all(base in _BASES for base in k_mer)
     }
+    indices = np.array([_k_mer_index(x) for x in frequencies], dtype=np.int64)
+    order = np.argsort(indices)
+    return indices[order], np.array(list(frequencies.values()), dtype=float)[order]
+
+
+def _align(target, observed, mode):
+    """Builds comparable vectors from sparse target and observed frequencies.
+
+    Both are (indices, frequencies) tuples. The vectors hold one element per
+    observed *k*-mer, plus one that stands in for all the target *k*-mers that
+    were not observed, chosen such that the distance for ``mode`` is the same
+    as between the full 4 :sup:`k` vectors. That way each comparison costs time
+    proportional to the sequence length rather than the size of the target.
+    """
+    indices, values = target
+    if len(indices):
+        positions = np.minimum(np.searchsorted(indices, observed[0]), len(indices) - 1)
+        found = values[positions] * (indices[positions] == observed[0])
+    else:
+        found = np.zeros(len(observed[0]))
+
+    # Euclidean and cosine distance grow with the sum of squares of the target
+    # values missing from the sequence, whereas JSD grows linearly with their sum
+    if mode == "JSD":
+        rest = max(values.sum() - found.sum(), 0)
+    else:
+        rest = np.sqrt(max(np.dot(values, values) - np.dot(found, found), 0))
+    return np.append(found, rest), np.append(observed[1], 0)
+
+
+# the measures of fitness that generate supports
+_MODES = ("ED", "JSD", "cosine")
+
+
+def _distance_sums(target, frequencies, mode):
+    """Sums the elementwise terms from which a distance is computed.
+
+    Every supported distance is a function of a few sums over the elements of
+    the vectors compared, so it can be updated as some elements change by
+    subtracting their old terms and adding the new ones.
+
+    Args:
+        target (numpy.ndarray): The target vector.
+        frequencies (numpy.ndarray): The vectors to compare to it, one per row if 2-D.
+        mode (str): The distance; see :func:`generate`.
+
+    Returns:
+        numpy.ndarray: The sums for each vector, along the last axis: the squared distance for ED, the divergence (over however many distributions are concatenated) for JSD and the dot product with the target and squared norm for cosine.
+    """
+    if mode == "ED":
+        return np.sum((target - frequencies) ** 2, axis=-1)[..., None]
+    if mode == "JSD":
+        return np.sum(_jsd_terms(target, frequencies), axis=-1)[..., None]
+    return np.stack(
+        (np.sum(target * frequencies, axis=-1), np.sum(frequencies**2, axis=-1)),
+        axis=-1,
+    )
+
+
+class Evaluator(object):
+    """Scores sequences against target *k*-mer and codon frequencies.
+
+    The targets are validated and compiled once, into a dense target vector
+    for *k* <= 8 and codons and sorted sparse arrays for larger *k*, so that
+    many sequences can be scored quickly. :func:`generate` uses one to measure
+    fitness, and it may be used directly to compare existing sequences.
+
+    Args:
+        target_params (dict): The target frequencies; see :func:`generate`.
+        mode (str, optional): How to measure the distance from the target; see :func:`generate`. Defaults to ``"ED"``.
+
+    Raises:
+        ValueError: If a target does not sum to 1, is keyed by something other than *k* or ``"codons"`` or has *k*-mers of another length, or if ``mode`` is unknown.
+
+    Example:
+        >>> evaluator = Evaluator({1: {"A": 0.5, "T": 0.5}})
+        >>> evaluator.score_seqs(["AAATTT", "GGGCCC"])
+        array([0.        , 1.        ])
+    """
+
+    def __init__(self, target_params, mode="ED"):
+        if mode not in _MODES:
+            raise ValueError("Fitness mode must be one of %s" % ", ".join(_MODES))
+        for target, frequencies in target_params.items():
+            if target != "codons" and not (
+                isinstance(target, numbers.Integral)
+                and not isinstance(target, bool)
+                and target > 0
+            ):
+                raise ValueError(
+                    'Targets must be keyed by a positive k or "codons", not %r' % target
+                )
+            if not isclose(sum(frequencies.values()), 1):
+                raise ValueError(
+                    "Target frequencies for " + str(target) + " do not sum to 1.0"
+                )
+        self.mode = mode
+        target_params = {
+            (target if target == "codons" else int(target)): frequencies
+            for target, frequencies in target_params.items()
+        }
+
+        # get the target values of k. Targets with too many possible k-mers for
+        # a dense vector are compared sparsely, over only the k-mers that occur.
+        self.k = list(target_params.keys())
+        self.codons = "codons" in target_params
+        self.dense_k = sorted(
+            x for x in self.k if x != "codons" and 4**x <= _MAX_DENSE_K_MERS
+        )
+        self.sparse_k = sorted(
+            x for x in self.k if x != "codons" and 4**x > _MAX_DENSE_K_MERS
+        )
+
+        # the dense target, with missing k-mers as 0. Each k (and the codons)
+        # has a block, in which each k-mer is found by its index.
+        blocks = [4**_k for _k in self.dense_k] + ([64] if self.codons else [])
+        self.offsets = np.cumsum([0] + blocks)
+        self.target = np.zeros(self.offsets[-1])
+        for offset, _k in zip(self.offsets, self.dense_k + ["codons"] * self.codons):
+            length = 3 if _k == "codons" else _k
+            for k_mer, frequency in target_params[_k].items():
+                if len(k_mer) != length:
+                    raise ValueError(
+                        "Targets for %s may only contain k-mers of length %i"
+                        % ("codons" if _k == "codons" else "k=%i" % _k, length)
+                    )
+                if all(base in _BASES for base in k_mer):
+                    self.target[offset + _k_mer_index(k_mer)] = frequency
+        self.sparse_targets = {
+            _k: _sparse_target(target_params[_k], _k) for _k in self.sparse_k
+        }
+        self.norm = np.sqrt(
+            np.dot(self.target, self.target)
+            + sum(np.dot(values, values) for _, values in self.sparse_targets.values())
+        )
+
+        # the target with the spare slot of each individual's listing, and the
+        # tables that depend on the length of the genomes, by length
+        self._target = np.append(self.target, 0)
+        self._divisors = {}
+        self._delta_tables = {}
+
+    def __getstate__(self):
+        # leave out the delta tables, which are large and rebuilt when needed,
+        # so that evaluators are cheap to send to other processes
+        state = self.__dict__.copy()
+        state["_delta_tables"] = {}
+        return state
+
+    def divisors(self, length):
+        """Returns what to divide counts by to get frequencies, for genomes of a length.
+
+        Args:
+            length (int): The length of the genomes, in codons.
+
+        Returns:
+            numpy.ndarray: The number of *k*-mers of each element of the dense target, plus 1 for the spare slot.
+
+        Raises:
+            ValueError: If the genomes are shorter than the largest *k*.
+        """
+        try:
+            return self._divisors[length]
+        except KeyError:
+            pass
+        k = self.dense_k + self.sparse_k
+        if k and max(k) > 3 * length:
+            raise ValueError(
+                "k (%i) may not be less then length of seq (%i)." % (max(k), 3 * length)
+            )
+        divisors = np.concatenate(
+            [np.zeros(0)]
+            + [np.full(4**_k, 3 * length - _k + 1) for _k in self.dense_k]
+            + ([np.full(64, length)] if self.codons else [])
+            + [[1]]
+        )
+        return self._divisors.setdefault(length, divisors)
+
+    def elements(self, genomes):
+        """Lists where each of some genomes' k-mers and codons is counted.
+
+        Args:
+            genomes (numpy.ndarray): Codon indices, one genome per row.
+
+        Returns:
+            numpy.ndarray: One row per genome, laid out as in :func:`_delta_table`, with the spare slot pointing one past the end of the dense target.
+        """
+        codes = _CODON_CODES[genomes].reshape(len(genomes), -1)
+        output = [np.zeros((len(genomes), 0), dtype=np.int64)] + [
+            self.offsets[i] + _k_mer_indices(codes, _k)
+            for i, _k in enumerate(self.dense_k)
+        ]
+        if self.codons:
+            output.append(self.offsets[-2] + genomes)
+        output.append(np.full((len(genomes), 1), len(self.target)))
+        return np.concatenate(output, axis=1).astype(np.int32)
+
+    def count(self, listing):
+        """Counts listed k-mers and codons in the layout of the target, plus the spare.
+
+        Each row is counted separately, in a single pass over all of them.
+        """
+        size = len(self._target)
+        rows = np.arange(len(listing))[:, None] * size
+        return np.bincount(
+            (listing + rows).ravel(), minlength=len(listing) * size
+        ).reshape(len(listing), size)
+
+    def sums(self, genomes):
+        """Computes the distance sums (see :func:`_distance_sums`) of some genomes.
+
+        Args:
+            genomes (numpy.ndarray): Codon indices, one genome per row.
+
+        Returns:
+            tuple: The listing of each genome's k-mers (see :meth:`elements`), its counts and the sums over the dense target.
+        """
+        listing = self.elements(genomes)
+        counts = self.count(listing)
+        frequencies = counts[:, :-1] / self.divisors(genomes.shape[1])[:-1]
+        return listing, counts, _distance_sums(self.target, frequencies, self.mode)
+
+    def sparse_sums(self, genome):
+        """Computes the distance sums of a genome over the sparse targets."""
+        sums = 0
+        if not self.sparse_k:
+            return sums
+        codes = _CODON_CODES[genome].ravel()
+        for _k in self.sparse_k:
+            indices, counts = np.unique(_k_mer_indices(codes, _k), return_counts=True)
+            target, output = _align(
+                self.sparse_targets[_k],
+                (indices, counts / (len(codes) - _k + 1)),
+                self.mode,
+            )
+            sums = sums + _distance_sums(target, output, self.mode)
+        return sums
+
+    def distance(self, sums):
+        """Computes the distance from the sums of :func:`_distance_sums`."""
+        if self.mode == "ED":
+            return np.sqrt(np.maximum(sums[..., 0], 0))
+        if self.mode == "JSD":
+            # each k is a distribution, so the concatenated vectors sum to len(k)
+            return np.maximum(sums[..., 0], 0) / len(self.k)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.nan_to_num(
+                1 - sums[..., 0] / (self.norm * np.sqrt(sums[..., 1])), nan=1
+            )
+
+    def score_many(self, genomes):
+        """Scores genomes of the same length.
+
+        Args:
+            genomes (numpy.ndarray): Codon indices (see :func:`dna_to_codons`), one genome per row.
+
+        Returns:
+            numpy.ndarray: The distance of each genome from the target.
+        """
+        genomes = np.asarray(genomes)
+        sums = self.sums(genomes)[2]
+        for i, genome in enumerate(genomes):
+            sums[i] += self.sparse_sums(genome)
+        return self.distance(sums)
+
+    def score(self, genome):
+        """Scores a genome.
+
+        Args:
+            genome (numpy.ndarray): Codon indices (see :func:`dna_to_codons`).
+
+        Returns:
+            float: The distance of the genome from the target.
+        """
+        return self.score_many(np.asarray(genome)[None])[0]
+
+    def score_seqs(self, seqs):
+        """Scores DNA sequences, batching those of the same length together.
+
+        Args:
+            seqs (iterable): The sequences, each made up of whole codons of A, C, G, and T.
+
+        Returns:
+            numpy.ndarray: The distance of each sequence from the target.
+        """
+        genomes = [dna_to_codons(seq) for seq in seqs]
+        scores = np.empty(len(genomes))
+        by_length = defaultdict(list)
+        for i, genome in enumerate(genomes):
+            by_length[len(genome)].append(i)
+        for rows in by_length.values():
+            scores[rows] = self.score_many(np.stack([genomes[i] for i in rows]))
+        return scores
+
+    def delta_table(self, length):
+        """Returns the table from :func:`_delta_table` for genomes of a length."""
+        if length not in self._delta_tables:
+            self._delta_tables[length] = _delta_table(length, self.dense_k, self.codons)
+        return self._delta_tables[length]
+
+    def update(self, genomes, rows, state):
+        """Updates the counts of some genomes from the genomes they were made for.
+
+        Only the k-mers and codons overlapping codons that have changed are
+        recounted, for all the rows at once. The distance sums are left for
+        the caller to recompute from the counts.
+
+        Args:
+            genomes (numpy.ndarray): Codon indices, one genome per row.
+            rows (numpy.ndarray): The rows to update.
+            state (dict): The state kept by :meth:`array_fitness`, updated in place.
+        """
+        changed_rows, positions = np.nonzero(genomes[rows] != state["genomes"][rows])
+        changed_rows = rows[changed_rows]
+        slots, shifts = self.delta_table(genomes.shape[1])
+        width = state["listing"].shape[1]
+
+        # each k-mer's index moves by what its changed bases are worth, summed
+        # over the changed codons it overlaps
+        moves = (
+            shifts[positions]
+            * (
+                _CODON_CODES[genomes[changed_rows, positions]].astype(np.int64)
+                - _CODON_CODES[state["genomes"][changed_rows, positions]]
+            )[:, None, :]
+        ).sum(axis=2)
+        keys, inverse = np.unique(
+            (changed_rows[:, None] * width + slots[positions]).ravel(),
+            return_inverse=True,
+        )
+        moves = np.bincount(inverse, moves.ravel()).astype(np.int64)
+        key_rows, key_slots = np.divmod(keys, width)
+        removed = state["listing"][key_rows, key_slots].astype(np.int64)
+        added = removed + moves
+        state["listing"][key_rows, key_slots] = added
+        np.subtract.at(state["counts"], (key_rows, removed), 1)
+        np.add.at(state["counts"], (key_rows, added), 1)
+
+    def array_fitness(self, genomes, dirty, state, data=None):
+        """Computes the fitness of the dirty rows of a population.
+
+        For use as an :class:`~freqgen.pyeasyga.ArrayGeneticAlgorithm`'s
+        ``array_fitness_function``. The state holds, for every row, the genome
+        that was last evaluated, where each of its k-mers is counted, the
+        counts and its distance sums over the dense target. Rows that differ
+        from their last evaluated genome in only a few codons (e.g. after
+        mutation) have their counts updated from it incrementally, and the
+        rest are counted in a single pass. The distance sums are always
+        computed from the counts as :meth:`sums` does, rather than updated by
+        the change in each term, so that a row scores the same however it was
+        counted, e.g. when chunks of the population are scored in other
+        processes.
+
+        Args:
+            genomes (numpy.ndarray): Codon indices, one genome per row.
+            dirty (numpy.ndarray): Whether to evaluate each row.
+            state (dict): The state, carried between calls by the caller and updated in place. Empty at first.
+            data (optional): The seed data, which is not used.
+
+        Returns:
+            numpy.ndarray: The fitness of each dirty row.
+        """
+        rows = np.flatnonzero(dirty)
+        if not state:  # count everything the first time
+            rows = np.arange(len(genomes))
+            listing, counts, sums = self.sums(genomes)
+            state.update(
+                genomes=genomes.copy(), listing=listing, counts=counts, sums=sums
+            )
+        else:
+            changes = np.count_nonzero(genomes[rows] != state["genomes"][rows], axis=1)
+            recount = rows[changes > genomes.shape[1] // 16]
+            if len(recount):
+                (
+                    state["listing"][recount],
+                    state["counts"][recount],
+                    state["sums"][recount],
+                ) = self.sums(genomes[recount])
+            update = rows[(changes > 0) & (changes <= genomes.shape[1] // 16)]
+            if len(update):
+                self.update(genomes, update, state)
+                divisors = self.divisors(genomes.shape[1])[:-1]
+                state["sums"][update] = _distance_sums(
+                    self.target, state["counts"][update, :-1] / divisors, self.mode
+                )
+            state["genomes"][rows] = genomes[rows]
+
+        sums = state["sums"][np.flatnonzero(dirty)]
+        for i, genome in enumerate(genomes[np.flatnonzero(dirty)]):
+            sums[i] += self.sparse_sums(genome)
+        return self.distance(sums)
+
+    def move_fitness(self, state, positions, codons):
+        """Computes the fitness of a genome after each of some one-codon changes.
+
+        Each change is scored on its own, from the state of the genome alone,
+        by recounting only the k-mers that overlap it.
+
+        Args:
+            state (dict): The state kept by :meth:`array_fitness` for a single genome.
+            positions (numpy.ndarray): The position of each change.
+            codons (numpy.ndarray): The codon each change puts there.
+
+        Returns:
+            numpy.ndarray: The fitness of the genome after each change.
+        """
+        genome = state["genomes"][0]
+        slots, shifts = self.delta_table(len(genome))
+        divisors = self.divisors(len(genome))
+        size = len(self._target)
+
+        changed = (
+            _CODON_CODES[codons].astype(np.int64) - _CODON_CODES[genome[positions]]
+        )
+        moves = (shifts[positions] * changed[:, None, :]).sum(axis=2)
+        removed = state["listing"][0, slots[positions]].astype(np.int64)
+        offsets = np.arange(len(positions))[:, None] * size
+        keys, inverse = np.unique(
+            np.concatenate(
+                ((offsets + removed).ravel(), (offsets + removed + moves).ravel())
+            ),
+            return_inverse=True,
+        )
+        changes = np.bincount(inverse, np.repeat([-1.0, 1.0], removed.size), len(keys))
+        changes_of, elements = np.divmod(keys, size)
+
+        target, divisors = self._target[elements, None], divisors[elements, None]
+        counts = state["counts"][0, elements, None]
+        terms = _distance_sums(
+            target, (counts + changes[:, None]) / divisors, self.mode
+        )
+        terms -= _distance_sums(target, counts / divisors, self.mode)
+        sums = np.tile(state["sums"][0], (len(positions), 1))
+        np.add.at(sums, changes_of, terms)
+
+        if self.sparse_k:
+            for i, (position, codon) in enumerate(zip(positions, codons)):
+                changed = genome.copy()
+                changed[position] = codon
+                sums[i] += self.sparse_sums(changed)
+        return self.distance(sums)
+
+
+def _genetic_algorithm(
+    evaluator,
+    code,
+    insert,
+    population_size=100,
+    mutation_probability=0.3,
+    crossover_probability=0.8,
+    fitness_function=None,
+    fitness_cache_size=0,
+    jobs=1,
+    executor=None,
+    rng=None,
+):
+    """Sets up a genetic algorithm to choose the codons of a back-translated sequence.
+
+    The arguments are as for :func:`generate`, given the compiled targets, the
+    :class:`~freqgen.freqgen.GeneticCode`, the initial genome of codon indices
+    and the :class:`numpy.random.Generator` to draw from.
+
+    Returns:
+        ArrayGeneticAlgorithm: The genetic algorithm, before its first generation.
+    """
+    ga = ArrayGeneticAlgorithm(
+        insert,
+        crossover_probability=crossover_probability,
+        maximise_fitness=False,
+        population_size=population_size,
+        mutation_probability=mutation_probability,
+        fitness_cache_size=fitness_cache_size,
+        jobs=jobs,
+        executor=executor,
+        rng=rng,
+    )
+
+    if fitness_function:
+        ga.fitness_function = fitness_function
+    else:
+        ga.array_fitness_function = evaluator.array_fitness
+
+    # only codons with synonyms can be changed
+    mutable = np.flatnonzero(code.degeneracy[insert] > 1)
+
+    def mutate(genes):
+        if len(mutable):
+            # replace a random codon in each row with a synonym
+            rows = np.arange(len(genes))
+            positions = mutable[ga.rng.integers(len(mutable), size=len(genes))]
+            genes[rows, positions] = _random_synonyms(
+                code, genes[rows, positions], ga.rng
+            )
+
+    ga.population_mutate_function = mutate
+
+    # genomes are arrays of codons, so every crossover point is at a codon boundary
+    if len(insert) > 1:
+        ga.population_crossover_function = ga.population_crossover
+    else:
+        ga.crossover_probability = 0
+    ga.population_selection_function = ga.population_tournament_selection
+
+    def create_individual(seed_data):
+        individual = seed_data.copy()
+        individual[mutable] = _random_synonyms(code, seed_data[mutable], ga.rng)
+        return individual
+
+    ga.create_individual = create_individual
+    return ga
+
+
+def _evolve_island(evaluator, genetic_code, insert, genes, generations, rng, options):
+    """Evolves an island's population for a number of generations.
+
+    Runs in a worker process for the island model of :func:`generate`.
+
+    Args:
+        evaluator (Evaluator): The compiled targets.
+        genetic_code (int): The genetic code.
+        insert (numpy.ndarray): The initial genome of codon indices.
+        genes (numpy.ndarray): The island's population, one genome per row, or None to start a random one.
+        generations (int): The number of generations to evolve for.
+        rng (numpy.random.Generator): The island's random number generator.
+        options (dict): The other arguments for :func:`_genetic_algorithm`.
+
+    Returns:
+        tuple: The genomes of the final population, their fitnesses and the generator, to continue from.
+    """
+    ga = _genetic_algorithm(
+        evaluator, GeneticCode.get(genetic_code), insert, rng=rng, **options
+    )
+    ga.initial_genes = genes
+    ga.create_first_generation()
+    for _ in range(generations):
+        ga.create_next_generation()
+    return ga.genes, ga.fitnesses, ga.rng
+
+
+def _island_model(
+    evaluator,
+    genetic_code,
+    insert,
+    islands,
+    migration_interval,
+    migration_size,
+    max_gens_since_improvement,
+    improvement_rel_threshold,
+    verbose,
+    jobs,
+    executor,
+    options,
+    seed_sequence,
+    initial_genes=None,
+):
+    """Evolves several populations, passing the best of each to the next in a ring.
+
+    The arguments are as for :func:`generate`, with the
+    :class:`numpy.random.SeedSequence` to spawn each island's from and the
+    genomes to start each island's population from, if any.
+
+    Returns:
+        numpy.ndarray: The fittest genome found.
+    """
+    if executor is None and jobs != 1:
+        executor = shared_executor(jobs)
+    migration_size = min(migration_size, options["population_size"])
+    populations = [initial_genes] * islands
+    rngs = [np.random.default_rng(seed) for seed in seed_sequence.spawn(islands)]
+    best_fitness, best_genes = np.inf, insert
+    gens_since_improvement = 0
+    counter = 0
+
+    try:
+        while gens_since_improvement < max_gens_since_improvement:
+            tasks = [
+                (
+                    evaluator,
+                    genetic_code,
+                    insert,
+                    genes,
+                    migration_interval,
+                    rng,
+                    options,
+                )
+                for genes, rng in zip(populations, rngs)
+            ]
+            if executor is None:
+                results = [_evolve_island(*task) for task in tasks]
+            else:
+                futures = [executor.submit(_evolve_island, *task) for task in tasks]
+                results = [future.result() for future in futures]
+            counter += migration_interval
+            rngs = [rng for _, _, rng in results]
+
+            genes, fitnesses, _ = min(results, key=lambda result: result[1].min())
+            fitness, genes = fitnesses.min(), genes[np.argmin(fitnesses)].copy()
+            if fitness < best_fitness * (1 - improvement_rel_threshold):
+                best_fitness, best_genes = fitness, genes
+                gens_since_improvement = 0
+            else:
+                gens_since_improvement += migration_interval
+                if fitness < best_fitness:
+                    best_fitness, best_genes = fitness, genes
+
+            # each island's best replace the worst of the next island
+            orders = [np.argsort(fitnesses) for _, fitnesses, _ in results]
+            populations = [genes for genes, _, _ in results]
+            migrants = [
+                genes[order[:migration_size]]
+                for genes, order in zip(populations, orders)
+            ]
+            for i in range(islands):
+                worst = orders[i][len(orders[i]) - migration_size :]
+                populations[i][worst] = migrants[i - 1]
+
+            if verbose:
+                status = "Gen: %s\tSince Improvement: %s/%s\tFitness: %s" % (
+                    counter,
+                    gens_since_improvement,
+                    max_gens_since_improvement,
+                    best_fitness,
+                )
+                print(status.expandtabs(15), end="\r")
+    except KeyboardInterrupt:
+        print("\nStopping early...")
+
+    if verbose:
+        print()
+    return best_genes
+
+
+def _beam_search(evaluator, code, insert, width):
+    """Back-translates a sequence codon by codon, keeping the best partial sequences.
+
+    At each position, every partial sequence in the beam is extended with
+    every synonymous codon, and the ``width`` extensions whose *k*-mers and
+    codons so far are closest to the targets are kept, dropping any with the
+    same counts and context as a better one. Only the dense targets are
+    compared until the end, so the cost grows with :math:`4^k`.
+
+    The arguments are as for :func:`generate`, given the compiled targets, the
+    :class:`~freqgen.freqgen.GeneticCode` and the initial genome of codon indices.
+
+    Returns:
+        numpy.ndarray: The genomes in the final beam, one per row, fittest first.
+    """
+    residues = code.codon_amino_acids[insert]
+    context = -(-(max(evaluator.dense_k, default=1) - 1) // 3)  # in codons
+    blocks = np.diff(evaluator.offsets)
+    tails = np.zeros((1, 0), dtype=np.uint8)
+    counts = np.zeros((1, len(evaluator._target)), dtype=np.int64)
+    parents, codons = [], []
+
+    for i, residue in enumerate(residues):
+        choices = code.codon_choices[
+            residue, : code.degeneracy[code.codon_choices[residue, 0]]
+        ]
+        beams = len(tails)
+
+        # the bases each extension adds to the end of each partial sequence
+        window = np.concatenate(
+            (
+                np.repeat(
+                    _CODON_CODES[tails].reshape(beams, 1, -1), len(choices), axis=1
+                ),
+                np.broadcast_to(_CODON_CODES[choices], (beams, len(choices), 3)),
+            ),
+            axis=2,
+        ).reshape(beams * len(choices), -1)
+        added = [np.zeros((len(window), 0), dtype=np.int64)]
+        for offset, _k in zip(evaluator.offsets, evaluator.dense_k):
+            if window.shape[1] >= _k:
+                added.append(offset + _k_mer_indices(window, _k)[:, -3:])
+        if evaluator.codons:
+            added.append(evaluator.offsets[-2] + np.tile(choices, beams)[:, None])
+        added = np.concatenate(added, axis=1)
+        candidates = np.repeat(counts, len(choices), axis=0)
+        np.add.at(candidates, (np.arange(len(window))[:, None], added), 1)
+
+        # rank the extensions by how close their frequencies so far are
+        divisors = [max(3 * (i + 1) - _k + 1, 1) for _k in evaluator.dense_k]
+        divisors = np.repeat(divisors + [i + 1] * evaluator.codons, blocks)
+        fitnesses = evaluator.distance(
+            _distance_sums(
+                evaluator.target, candidates[:, :-1] / divisors, evaluator.mode
+            )
+        )
+        order = np.argsort(fitnesses, kind="stable")
+        states = np.concatenate(
+            (candidates, window[:, max(window.shape[1] - 3 * context, 0) :]), axis=1
+        )[order]
+        _, first = np.unique(
+            states.view(np.dtype((np.void, states.itemsize * states.shape[1]))).ravel(),
+            return_index=True,
+        )
+        keep = order[np.sort(first)[:width]]
+
+        parents.append(keep // len(choices))
+        codons.append(choices[keep % len(choices)])
+        counts = candidates[keep]
+        tails = np.concatenate((tails[parents[-1]], codons[-1][:, None]), axis=1)
+        tails = tails[:, max(tails.shape[1] - context, 0) :]
+
+    # follow the chosen codons back from each final partial sequence
+    genomes = np.empty((len(counts), len(insert)), dtype=np.uint8)
+    rows = np.arange(len(counts))
+    for i in range(len(insert) - 1, -1, -1):
+        genomes[:, i] = codons[i][rows]
+        rows = parents[i][rows]
+    return genomes[np.argsort(evaluator.score_many(genomes), kind="stable")]
+
+
+_OPTIMIZERS = ("ga", "anneal", "beam")
+
+# the number of moves proposed at once, from the same state
+_ANNEALING_BATCH = 32
+
+
+def _anneal(
+    evaluator,
+    code,
+    insert,
+    iterations,
+    time_limit=None,
+    initial_temperature=None,
+    cooling_rate=None,
+    fitness_function=None,
+    verbose=False,
+    genome=None,
+    rng=None,
+):
+    """Chooses the codons of a back-translated sequence by simulated annealing.
+
+    Each move replaces one codon with a synonym, and is accepted if it
+    improves the fitness or otherwise with probability
+    :math:`e^{-\\Delta / T}` at temperature :math:`T`. Moves are proposed in
+    batches from the same state and scored together with
+    :meth:`Evaluator.move_fitness`. Those after the first one accepted are
+    discarded, so it is the same as proposing them one at a time.
+
+    The arguments are as for :func:`generate`, given the compiled targets, the
+    :class:`~freqgen.freqgen.GeneticCode` and the initial genome of codon
+    indices, with the genome to start from, which is random if not given, and
+    the :class:`numpy.random.Generator` to draw from.
+
+    Returns:
+        numpy.ndarray: The fittest genome found.
+    """
+    rng = np.random.default_rng(rng)
+    mutable = np.flatnonzero(code.degeneracy[insert] > 1)
+    if genome is None:
+        genome = insert.copy()
+        genome[mutable] = _random_synonyms(code, insert[mutable], rng)
+    else:
+        genome = genome.copy()
+    if not len(mutable):
+        return genome
+
+    state, dirty = {}, np.ones(1, dtype=bool)
+    if fitness_function:
+        fitness = fitness_function(genome, insert)
+    else:
+        fitness = evaluator.array_fitness(genome[None], dirty, state)[0]
+
+    def propose(count):
+        positions = mutable[rng.integers(len(mutable), size=count)]
+        codons = _random_synonyms(code, genome[positions], rng)
+        if not fitness_function:
+            return positions, codons, evaluator.move_fitness(state, positions, codons)
+        fitnesses = []
+        for position, codon in zip(positions, codons):
+            changed = genome.copy()
+            changed[position] = codon
+            fitnesses.append(fitness_function(changed, insert))
+        return positions, codons, np.array(fitnesses)
+
+    # by default, start where a tenth of the moves that worsen fitness are accepted
+    if initial_temperature is None:
+        worse = propose(_ANNEALING_BATCH)[2] - fitness
+        worse = worse[worse > 0]
+        initial_temperature = worse.mean() / np.log(10) if len(worse) else 1e-9
+    # and cool a thousandfold over the iterations
+    if cooling_rate is None:
+        cooling_rate = 1e-3 ** (1 / max(iterations, 1))
+
+    best_fitness, best = fitness, genome.copy()
+    temperature = initial_temperature
+    iteration = 0
+    start = time.perf_counter()
+    try:
+        while iteration < iterations and (
+            time_limit is None or time.perf_counter() - start < time_limit
+        ):
+            count = min(_ANNEALING_BATCH, iterations - iteration)
+            positions, codons, fitnesses = propose(count)
+            temperatures = temperature * cooling_rate ** np.arange(count)
+            with np.errstate(over="ignore", divide="ignore"):
+                accepted = rng.random(count) < np.exp(
+                    (fitness - fitnesses) / temperatures
+                )
+            moves = np.argmax(accepted) + 1 if accepted.any() else count
+            iteration += moves
+            temperature *= cooling_rate**moves
+
+            if accepted.any():
+                genome[positions[moves - 1]] = codons[moves - 1]
+                if fitness_function:
+                    fitness = fitnesses[moves - 1]
+                else:
+                    fitness = evaluator.array_fitness(genome[None], dirty, state)[0]
+                if fitness < best_fitness:
+                    best_fitness, best = fitness, genome.copy()
+
+            if verbose:
+                status = "Iteration: %s/%s\tTemperature: %.3g\tFitness: %s" % (
+                    iteration,
+                    iterations,
+                    temperature,
+                    best_fitness,
+                )
+                print(status.expandtabs(15), end="\r")
+    except KeyboardInterrupt:
+        print("\nStopping early...")
+
+    if verbose:
+        print()
+    return best
+
+
+def _restarts(
+    evaluator, aa_seq, insert, restarts, seed, verbose, jobs, executor, settings
+):
+    """Runs :func:`generate` several times, each from its own child of the seed.
+
+    The arguments are as for :func:`generate`, given the compiled targets, the
+    initial genome of codon indices and the other arguments for each run.
+
+    Returns:
+        numpy.ndarray: The fittest genome found.
+    """
+    if executor is None and jobs != 1:
+        executor = shared_executor(jobs)
+    runs = [
+        dict(settings, target_params=evaluator, aa_seq=aa_seq, seed=child, jobs=1)
+        for child in seed.spawn(restarts)
+    ]
+    if executor is None:
+        results = (generate(**run) for run in runs)
+    else:
+        futures = [executor.submit(generate, **run) for run in runs]
+        results = (future.result() for future in futures)
+
+    best_fitness, best = np.inf, None
+    for i, result in enumerate(results):
+        genome = dna_to_codons(result)
+        if settings["fitness_function"]:
+            fitness = settings["fitness_function"](genome, insert)
+        else:
+            fitness = evaluator.score(genome)
+        if fitness < best_fitness:
+            best_fitness, best = fitness, genome
+        if verbose:
+            status = "Restart: %s/%s\tFitness: %s\tBest: %s" % (
+                i + 1,
+                restarts,
+                fitness,
+                best_fitness,
+            )
+            print(status.expandtabs(15))
+    return best
 
 
 def generate(
@@ -62,11 +1018,28 @@ def generate(
     verbose=False,
     mode="ED",
     fitness_function=None,
+    fitness_cache_size=0,
+    jobs=1,
+    executor=None,
+    islands=1,
+    migration_interval=10,
+    migration_size=1,
+    optimizer="ga",
+    iterations=None,
+    time_limit=None,
+    initial_temperature=None,
+    cooling_rate=None,
+    beam_width=None,
+    seed=None,
+    restarts=1,
+    checkpoint=None,
+    checkpoint_interval=10,
+    resume_from=None,
 ):
     """Generate a sequence matching :math:`k`-mer usage.
 
     Args:
-        target_params (dict): The parameters to optimize towards. Should be of the format {:math:`k_n`: {:math:`k_{n1}`: 0.2, :math:`k_{n2}`: 0.3,...}...}. Pass absolute codon usage with ``"codons"`` as the key.
+        target_params (dict): The parameters to optimize towards. Should be of the format {:math:`k_n`: {:math:`k_{n1}`: 0.2, :math:`k_{n2}`: 0.3,...}...}. Pass absolute codon usage with ``"codons"`` as the key. Missing *k*-mers are taken to have a frequency of 0, and for *k* > 8 only the *k*-mers that occur in the target or the sequence are compared, so large *k* may be targeted. May also be an :class:`Evaluator` compiled from them, in which case its mode is used.
         aa_seq (str): The amino acid sequence for the optimized sequence.
         population_size (int, optional): The size of the population for the genetic algorithm. Defaults to 100.
         mutation_probability (float, optional): The likelihood of changing each member of each generation. Defaults to 0.3.
@@ -75,166 +1048,187 @@ def generate(
         improvement_rel_threshold (float, optional): The minimum ftness improvement in precentage for which to reset the value of generations since improvement. Defaults to 0, meaning that any improvement resets the counter. Greater values will result in earlier stopping.
         genetic_code (int, optional): The genetic code to use. Defaults to 11, the standard genetic code.
         verbose (bool, optional): Whether to print the generation number, generations since improvement, and fitness. Defaults to false.
-        mode (str, optional): Whether to use Jensen-Shannon Divergence or Euclidean distance. Defaults to ``"ED"``. Use ``"JSD"`` for Jensen-Shannon Divergence.
-        fitness_function (function, optional): A function by which to measure the fitness of a potential sequence. Must take a vector representing a sequence and return a float, with lower scores indicating greater fitness. Defaults to None, in which case it uses either JSD or ED.
+        mode (str, optional): How to measure the distance from the target. Defaults to ``"ED"``, Euclidean distance. Use ``"JSD"`` for Jensen-Shannon divergence (see :func:`~freqgen.freqgen.jensen_shannon_divergence`), averaged over the targets, or ``"cosine"`` for cosine distance.
+        fitness_function (function, optional): A function by which to measure the fitness of a potential sequence. Must take an array of codon indices (see :func:`dna_to_codons`) and the seed data and return a float, with lower scores indicating greater fitness. Defaults to None, in which case it uses ``mode``.
+        fitness_cache_size (int, optional): The number of fitnesses to remember by sequence, so that sequences that reappear are not evaluated again. Defaults to 0, remembering none. Individuals that are carried over unchanged are never evaluated again either way.
+        jobs (int, optional): The number of processes to evaluate fitness with, from a pool shared across generations and calls. Use None or 0 for one per CPU. Fitness is evaluated in at most one process per CPU, and in this process on a single CPU, because each process scores the sequences it is sent from scratch rather than updating their scores as this one does, so parallel evaluation only pays off with several CPUs and large populations or long sequences. Defaults to 1, evaluating fitness in this process, which is also the only way to use a ``fitness_function`` that cannot be pickled.
+        executor (concurrent.futures.Executor, optional): An executor to evaluate fitness with instead of the shared pool. Defaults to None.
+        islands (int, optional): The number of populations, each of ``population_size``, to evolve separately. With more than one, each island evolves in one of the ``jobs`` processes (or the ``executor``) instead of fitness being evaluated in them, and ``max_gens_since_improvement`` is counted in whole migration intervals. Defaults to 1, a single population.
+        migration_interval (int, optional): The number of generations between migrations, in which the fittest members of each island replace the least fit of the next. Defaults to 10.
+        migration_size (int, optional): The number of members to migrate from each island. Defaults to 1.
+        optimizer (str, optional): How to search for the sequence. Defaults to ``"ga"``, the genetic algorithm. Use ``"anneal"`` for simulated annealing, which changes one codon at a time and is usually much faster, or ``"beam"`` for a beam search that builds the sequence codon by codon in a single pass; the genetic algorithm's parameters do not apply to them.
+        iterations (int, optional): The number of moves for simulated annealing to propose. Defaults to None, which is 30 per codon.
+        time_limit (float, optional): The number of seconds after which to stop simulated annealing. Defaults to None, for no limit.
+        initial_temperature (float, optional): The temperature to start simulated annealing at. Defaults to None, which is chosen so that about a tenth of the first moves that worsen fitness are accepted.
+        cooling_rate (float, optional): The factor to multiply the temperature by after each move. Defaults to None, which cools it a thousandfold over the iterations.
+        beam_width (int, optional): The number of partial sequences for beam search to keep. With another optimizer, its results seed the genetic algorithm's first population or are where simulated annealing starts. Defaults to None, which is 16 for beam search and no seeding otherwise. Beam search compares partial sequences with the targets for *k* up to 8 only, with the distance from ``mode`` whatever the ``fitness_function``.
+        seed (int or numpy.random.SeedSequence, optional): The seed for all the random choices, so that the result can be reproduced. Defaults to None, for a fresh one each time.
+        restarts (int, optional): The number of independent optimizations to run, returning the fittest result. They run in the ``jobs`` processes (or the ``executor``), each evolving in one process, and each draws from its own child of the ``seed``, so restart *i* gives the same result as a single run with ``seed=numpy.random.SeedSequence(seed).spawn(restarts)[i]``. Defaults to 1.
+        checkpoint (str, optional): The path of a file to save the genetic algorithm's state to every ``checkpoint_interval`` generations, when stopped early and at the end, so that it can be resumed. Only for a single population of the genetic algorithm. Defaults to None, for no checkpoints.
+        checkpoint_interval (int, optional): The number of generations between checkpoints. Defaults to 10.
+        resume_from (str, optional): The path of a checkpoint to continue from instead of starting a new population. It must be for the same amino acid sequence and genetic code, and the other arguments should be as they were. Defaults to None.
 
     Returns:
         str: The generated sequence.
     """
 
+    aa_seq = str(aa_seq)
     if all([char in {"A", "T", "G", "C"} for char in aa_seq]):
         warn(
             "This appears to be a DNA sequence, not an amino acid sequence. Ensure that you are passing in an amino acid sequence."
         )
 
-    for target, frequencies in target_params.items():
-        print(sum(frequencies.values()))
-        if not isclose(sum(frequencies.values()), 1):
-            raise ValueError(
-                "Target frequencies for " + str(target) + " do not sum to 1.0"
-            )
-
-    # back translate to an initial seq
-    insert = ""
-    for aa in aa_seq:
-        try:
-            insert += Bio.Data.CodonTable.unambiguous_dna_by_id[
-                genetic_code
-            ].back_table[aa]
-        except KeyError:
-            if aa == "*":
-                insert += Bio.Data.CodonTable.unambiguous_dna_by_id[
-                    genetic_code
-                ].back_table[None]
-
-    # create the genetic algorithm instance
-    ga = GeneticAlgorithm(
-        dna_to_vector(insert),
-        crossover_probability=crossover_probability,
-        maximise_fitness=False,
-        population_size=population_size,
-        mutation_probability=mutation_probability,
+    # compile the targets, which validates them
+    evaluator = (
+        target_params
+        if isinstance(target_params, Evaluator)
+        else Evaluator(target_params, mode)
     )
 
-    # get the target values of k
-    k = list(target_params.keys())
+    # back translate to an initial genome of codon indices
+    code = GeneticCode.get(genetic_code)
+    try:
+        residues = code.amino_acid_indices[
+            np.frombuffer(aa_seq.encode("ascii"), dtype=np.uint8)
+        ]
+    except UnicodeEncodeError:
+        residues = np.array([-1])
+    if (residues < 0).any():
+        raise ValueError(
+            "Amino acid sequence contains residues not in genetic code %i"
+            % genetic_code
+        )
+    insert = code.codon_choices[residues, 0].astype(np.uint8)
 
-    # generate the target vector from the input dict
-    target = np.array([])
-    for _k in sorted([x for x in k if x != "codons"]):
-        target = np.concatenate(
-            (
-                target,
-                [x[1] for x in sorted(target_params[_k].items(), key=lambda x: x[0])],
-            )
+    evaluator.divisors(len(insert))  # check that the insert is long enough
+    if optimizer not in _OPTIMIZERS:
+        raise ValueError(
+            "optimizer must be one of %s, not %r." % (", ".join(_OPTIMIZERS), optimizer)
         )
-    if "codons" in k:
-        target = np.concatenate(
-            (
-                target,
-                [
-                    x[1]
-                    for x in sorted(target_params["codons"].items(), key=lambda x: x[0])
-                ],
-            )
+    if restarts < 1:
+        raise ValueError("restarts must be at least 1.")
+    if iterations is not None and iterations < 0:
+        raise ValueError("iterations must be at least 0.")
+    if (checkpoint or resume_from) and (
+        optimizer != "ga" or islands > 1 or restarts > 1
+    ):
+        raise ValueError(
+            "Checkpoints are only supported for a single population of the "
+            "genetic algorithm."
         )
-
-    def vector(seq):
-        output = np.array([])
-        if [k for k in k if k != "codons"]:
-            output = np.concatenate(
-                (
-                    output,
-                    k_mer_frequencies(
-                        seq,
-                        [x for x in k if x != "codons"],
-                        include_missing=True,
-                        vector=True,
-                    ),
-                )
-            )
-        if "codons" in k:
-            output = np.concatenate(
-                (
-                    output,
-                    [
-                        x[1]
-                        for x in sorted(
-                            codon_frequencies(seq).items(), key=lambda x: x[0]
-                        )
-                    ],
-                )
-            )
-        return output
-
-    def fitness(individual, data):
-        individual = vector_to_dna(individual)
-        if mode == "JSD":
-            return jensen_shannon_divergence(
-                [
-                    dit.ScalarDistribution(target / len(k)),
-                    dit.ScalarDistribution(vector(individual) / len(k)),
-                ]
-            )
-        if mode == "ED":
-            return np.linalg.norm(target - vector(individual))
-        raise Exception("Fitness mode must be JSD or ED")
-
-    ga.fitness_function = fitness if not fitness_function else fitness_function
-
-    synonymous_codons = _synonymous_codons(genetic_codes[genetic_code])
-
-    def mutate(individual):
-        while True:
-            # choose a random codon
-            codon_idx = np.random.randint(len(individual) / 6) * 6
-
-            # figure out which codon it is
-            codon = vector_to_dna(individual[codon_idx : codon_idx + 6])
-
-            # ensure that mutations actually change the sequence
-            if len(synonymous_codons[codon]) != 1:
-                break
-
-        # choose a new one at random for the AA
-        new_codon = dna_to_vector(
-            np.random.choice([x for x in synonymous_codons[codon] if x != codon])
+    if checkpoint_interval < 1:
+        raise ValueError("checkpoint_interval must be at least 1.")
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    if restarts > 1:
+        settings = dict(
+            population_size=population_size,
+            mutation_probability=mutation_probability,
+            crossover_probability=crossover_probability,
+            max_gens_since_improvement=max_gens_since_improvement,
+            improvement_rel_threshold=improvement_rel_threshold,
+            genetic_code=genetic_code,
+            fitness_function=fitness_function,
+            fitness_cache_size=fitness_cache_size,
+            islands=islands,
+            migration_interval=migration_interval,
+            migration_size=migration_size,
+            optimizer=optimizer,
+            iterations=iterations,
+            time_limit=time_limit,
+            initial_temperature=initial_temperature,
+            cooling_rate=cooling_rate,
+            beam_width=beam_width,
         )
+        best = _restarts(
+            evaluator, aa_seq, insert, restarts, seed, verbose, jobs, executor, settings
+        )
+        assert (code.codon_amino_acids[best] == code.codon_amino_acids[insert]).all()
+        return codons_to_dna(best)
+    rng = np.random.default_rng(seed)
+    initial_genes = None
+    if optimizer == "beam" or beam_width:
+        initial_genes = _beam_search(evaluator, code, insert, beam_width or 16)
+        if optimizer == "beam":
+            return codons_to_dna(initial_genes[0])
 
-        # replace it in the individual
-        individual[codon_idx : codon_idx + 6] = new_codon
-
-        return individual
-
-    ga.mutate_function = mutate
-
-    def crossover(parent_1, parent_2):
-        parent_1, parent_2 = list(parent_1), list(parent_2)
-        index = random.randrange(1, len(parent_1) / 6) * 6
-        child_1 = parent_1[:index] + parent_2[index:]
-        child_2 = parent_2[:index] + parent_1[index:]
-        return child_1, child_2
-
-    ga.crossover_function = crossover
-
-    def create_individual(seed_data):
-        individual = vector_to_dna(seed_data)
-        new = ""
-        for codon in [individual[i : i + 3] for i in range(0, len(individual), 3)]:
-            if len(synonymous_codons[codon]) == 1:
-                new += codon
-                continue
-            new += np.random.choice([x for x in synonymous_codons[codon] if x != codon])
+    if optimizer == "anneal":
+        best = _anneal(
+            evaluator,
+            code,
+            insert,
+            30 * len(insert) if iterations is None else iterations,
+            time_limit=time_limit,
+            initial_temperature=initial_temperature,
+            cooling_rate=cooling_rate,
+            fitness_function=fitness_function,
+            verbose=verbose,
+            genome=None if initial_genes is None else initial_genes[0],
+            rng=rng,
+        )
+        assert (code.codon_amino_acids[best] == code.codon_amino_acids[insert]).all()
+        return codons_to_dna(best)
 
-        return dna_to_vector(new)
+    if islands < 1 or migration_interval < 1 or migration_size < 0:
+        raise ValueError(
+            "islands and migration_interval must be at least 1 and migration_size at least 0."
+        )
+    options = dict(
+        population_size=population_size,
+        mutation_probability=mutation_probability,
+        crossover_probability=crossover_probability,
+        fitness_function=fitness_function,
+        fitness_cache_size=fitness_cache_size,
+    )
+    if islands > 1:
+        best = _island_model(
+            evaluator,
+            genetic_code,
+            insert,
+            islands,
+            migration_interval,
+            migration_size,
+            max_gens_since_improvement,
+            improvement_rel_threshold,
+            verbose,
+            jobs,
+            executor,
+            options,
+            seed,
+            initial_genes,
+        )
+        assert (code.codon_amino_acids[best] == code.codon_amino_acids[insert]).all()
+        return codons_to_dna(best)
 
-    ga.create_individual = create_individual
+    ga = _genetic_algorithm(
+        evaluator, code, insert, jobs=jobs, executor=executor, rng=rng, **options
+    )
+    ga.initial_genes = initial_genes
 
     # set up for GA run
-    ga.create_first_generation()
-    gens_since_improvement = 0
-    best_indv_fitness = ga.best_individual()[0]
-    counter = 1
+    if resume_from:
+        saved = ga.load_checkpoint(resume_from)
+        if not np.array_equal(saved["insert"], insert):
+            raise ValueError(
+                "The checkpoint is for a different amino acid sequence or genetic code."
+            )
+        gens_since_improvement = int(saved["gens_since_improvement"])
+        best_indv_fitness = float(saved["best_fitness"])
+        counter = int(saved["generation"]) + 1
+    else:
+        ga.create_first_generation()
+        gens_since_improvement = 0
+        best_indv_fitness = ga.best_individual()[0]
+        counter = 1
+
+    def save_checkpoint():
+        ga.save_checkpoint(
+            checkpoint,
+            insert=insert,
+            generation=counter - 1,
+            gens_since_improvement=gens_since_improvement,
+            best_fitness=best_indv_fitness,
+        )
 
     # run the GA
     try:
@@ -248,23 +1242,87 @@ def generate(
             else:
                 gens_since_improvement += 1
             if verbose:
-                print(
-                    "Gen: %s\tSince Improvement: %s/%s\tFitness: %s".expandtabs(15)
-                    % (
-                        counter,
-                        gens_since_improvement,
-                        max_gens_since_improvement,
-                        ga.best_individual()[0],
-                    ),
-                    end="\r",
+                status = "Gen: %s\tSince Improvement: %s/%s\tFitness: %s" % (
+                    counter,
+                    gens_since_improvement,
+                    max_gens_since_improvement,
+                    ga.best_individual()[0],
                 )
+                if fitness_cache_size:
+                    status += "\tCache hits: %.1f%%" % (100 * ga.cache_hit_rate())
+                print(status.expandtabs(15), end="\r")
             counter += 1
+            if checkpoint and (counter - 1) % checkpoint_interval == 0:
+                save_checkpoint()
     except KeyboardInterrupt:
         print("\nStopping early...")
+        # the generation may have been interrupted midway, so evaluate it afresh
+        ga.state.clear()
+        ga.dirty[:] = True
+        ga.calculate_population_fitness()
+        ga.rank_population()
 
+    if checkpoint:
+        save_checkpoint()
     if verbose:
         print()
 
-    best_seq = vector_to_dna(ga.best_individual()[1])
-    assert Seq(best_seq).translate(genetic_code) == Seq(insert).translate(genetic_code)
+    best_seq = codons_to_dna(ga.best_individual()[1])
+    assert (
+        code.codon_amino_acids[ga.best_individual()[1]]
+        == code.codon_amino_acids[insert]
+    ).all()
     return best_seq
+
+
+def generate_many(
+    target_params, aa_seqs, mode="ED", jobs=1, executor=None, seed=None, **kwargs
+):
+    """Generate a sequence matching :math:`k`-mer usage for each of many amino acid sequences.
+
+    The targets are compiled once for all the sequences, which are then
+    optimized as separate tasks in a pool of processes. Results are yielded as
+    they finish, so they can be used before the rest are done.
+
+    Args:
+        target_params (dict): The parameters to optimize towards, as for :func:`generate`, or an :class:`Evaluator` compiled from them.
+        aa_seqs (list): The amino acid sequences.
+        mode (str, optional): How to measure the distance from the target, as for :func:`generate`. Defaults to ``"ED"``.
+        jobs (int, optional): The number of processes to optimize the sequences in, from a pool shared across calls. Use None or 0 for one per CPU. Defaults to 1, optimizing them one after another in this process.
+        executor (concurrent.futures.Executor, optional): An executor to optimize the sequences in instead of the shared pool. Defaults to None.
+        seed (int or numpy.random.SeedSequence, optional): The seed, from which each sequence gets its own child, so that the results can be reproduced. Defaults to None.
+        **kwargs: The other arguments for :func:`generate`, used for every sequence.
+
+    Yields:
+        tuple: The index of an amino acid sequence in ``aa_seqs`` and its generated sequence, in the order they finish.
+
+    Example:
+        >>> sorted(generate_many({1: {"A": 0.5, "T": 0.5}}, ["FK", "KF"], jobs=2))
+        [(0, 'TTTAAA'), (1, 'AAATTT')]
+    """
+    evaluator = (
+        target_params
+        if isinstance(target_params, Evaluator)
+        else Evaluator(target_params, mode)
+    )
+    aa_seqs = list(aa_seqs)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(len(aa_seqs))
+
+    if executor is None and jobs == 1:
+        for i, aa_seq in enumerate(aa_seqs):
+            yield i, generate(evaluator, aa_seq, seed=seeds[i], **kwargs)
+        return
+
+    executor = executor or shared_executor(jobs)
+    futures = {
+        executor.submit(generate, evaluator, aa_seq, seed=seeds[i], **kwargs): i
+        for i, aa_seq in enumerate(aa_seqs)
+    }
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:  # if the caller stops early
+            future.cancel()
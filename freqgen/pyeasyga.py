@@ -17,10 +17,16 @@
 
 """
 
+import json
+import os
 import random
 import copy
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from operator import attrgetter
 
+import numpy as np
+
 from six.moves import range
 
 
@@ -53,7 +59,10 @@ class GeneticAlgorithm(object):
                  crossover_probability=0.8,
                  mutation_probability=0.2,
                  elitism=True,
-                 maximise_fitness=True):
+                 maximise_fitness=True,
+                 fitness_cache_size=0,
+                 jobs=1,
+                 executor=None):
         """Instantiate the Genetic Algorithm.
 
         :param seed_data: input data to the Genetic Algorithm
@@ -62,6 +71,12 @@ class GeneticAlgorithm(object):
         :param int generations: number of generations to evolve
         :param float crossover_probability: probability of crossover operation
         :param float mutation_probability: probability of mutation operation
+        :param int fitness_cache_size: number of fitnesses to remember by
+            genome, least recently used first out; 0 to remember none
+        :param int jobs: number of processes to calculate fitness with, at
+            most one per CPU; None or 0 for one per CPU
+        :param executor: concurrent.futures executor to calculate fitness
+            with instead of a shared process pool
 
         """
 
@@ -72,6 +87,12 @@ class GeneticAlgorithm(object):
         self.mutation_probability = mutation_probability
         self.elitism = elitism
         self.maximise_fitness = maximise_fitness
+        self.fitness_cache_size = fitness_cache_size
+        self.jobs = jobs
+        self.executor = executor
+        self.fitness_cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
         self.current_generation = []
 
@@ -144,10 +165,102 @@ class GeneticAlgorithm(object):
     def calculate_population_fitness(self):
         """Calculate the fitness of every member of the given population using
         the supplied fitness_function.
+
+        Only dirty Chromosomes, i.e. those whose genes may have changed since
+        their fitness was calculated, are evaluated. If fitness_cache_size is
+        set, so are only those whose genes are not in the fitness cache.
+
+        If an executor is given, or jobs is not 1 and there is more than one
+        CPU, the population is split into a chunk per worker, which are
+        evaluated in other processes. The fitness function must then be
+        picklable.
+        """
+        population = [individual for individual in self.current_generation
+                      if individual.dirty]
+        if self.fitness_cache_size:
+            population = self._read_fitness_cache(population)
+
+        if not population:
+            return
+        workers = self._fitness_workers()
+        if workers:
+            self._calculate_fitness_in_parallel(population, workers)
+        else:
+            for individual in population:
+                individual.fitness = self.fitness_function(
+                    individual.genes, self.seed_data)
+
+        for individual in population:
+            individual.dirty = False
+        if self.fitness_cache_size:
+            self._write_fitness_cache(population)
+
+    def _fitness_workers(self):
+        """Return the number of workers to calculate fitness in, or 0 to
+        calculate it in this process.
+
+        Without an executor there are at most as many workers as CPUs. More
+        would only add the cost of sending them the fitness function and
+        genes each generation, so on a single CPU fitness is calculated
+        here, where an array_fitness_function also keeps its state.
+        """
+        workers = self.jobs if self.jobs and self.jobs > 1 \
+            else os.cpu_count()
+        if self.executor is not None:
+            return workers
+        if self.jobs == 1:
+            return 0
+        workers = min(workers, os.cpu_count() or 1)
+        return workers if workers > 1 else 0
+
+    def _calculate_fitness_in_parallel(self, population, workers):
+        """Calculate the fitness of the members of a population in other
+        processes, a chunk per worker.
         """
-        for individual in self.current_generation:
-            individual.fitness = self.fitness_function(
-                individual.genes, self.seed_data)
+        executor = self.executor or shared_executor(self.jobs)
+        size = -(-len(population) // workers)
+        chunks = [population[i:i + size]
+                  for i in range(0, len(population), size)]
+
+        futures = [executor.submit(_evaluate, self.fitness_function, 'genes',
+                                   [individual.genes for individual in chunk],
+                                   self.seed_data)
+                   for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            for individual, fitness in zip(chunk, future.result()):
+                individual.fitness = fitness
+
+    def _read_fitness_cache(self, population):
+        """Set the fitness of the members of a population found in the
+        fitness cache, and return the rest.
+        """
+        uncached = []
+        for individual in population:
+            key = _genome_key(individual.genes)
+            if key in self.fitness_cache:
+                self.fitness_cache.move_to_end(key)
+                individual.fitness = self.fitness_cache[key]
+                individual.dirty = False
+                self.cache_hits += 1
+            else:
+                uncached.append(individual)
+                self.cache_misses += 1
+        return uncached
+
+    def _write_fitness_cache(self, population):
+        """Remember the fitness of the members of a population, forgetting
+        the least recently used beyond fitness_cache_size.
+        """
+        for individual in population:
+            self.fitness_cache[_genome_key(individual.genes)] = \
+                individual.fitness
+        while len(self.fitness_cache) > self.fitness_cache_size:
+            self.fitness_cache.popitem(last=False)
+
+    def cache_hit_rate(self):
+        """Return the fraction of fitness cache lookups that were hits."""
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
 
     def rank_population(self):
         """Sort the population by fitness according to the order defined by
@@ -169,11 +282,15 @@ class GeneticAlgorithm(object):
             parent_2 = copy.deepcopy(selection(self.current_generation))
 
             child_1, child_2 = parent_1, parent_2
-            child_1.fitness, child_2.fitness = 0, 0
 
             can_crossover = random.random() < self.crossover_probability
             can_mutate = random.random() < self.mutation_probability
 
+            # children that are plain copies keep their parents' fitness
+            if can_crossover or can_mutate:
+                child_1.fitness, child_2.fitness = 0, 0
+                child_1.dirty, child_2.dirty = True, True
+
             if can_crossover:
                 child_1.genes, child_2.genes = self.crossover_function(
                     parent_1.genes, parent_2.genes)
@@ -227,17 +344,373 @@ class GeneticAlgorithm(object):
                 in self.current_generation)
 
 
+class ArrayGeneticAlgorithm(GeneticAlgorithm):
+    """Genetic Algorithm whose population is held in arrays.
+
+    Each generation's genes are the rows of one preallocated 2-D NumPy array,
+    with parallel arrays of fitnesses and dirty flags. Children are copied
+    into a second set of arrays by row assignment, which then swaps with the
+    first, so no Chromosomes are created or deep-copied.
+
+    The genes must be 1-D NumPy arrays of the same length. create_individual
+    returns one, crossover_function returns two children made from two
+    parents and mutate_function changes one in place, as for the
+    GeneticAlgorithm, while selection functions are given the array of
+    fitnesses and return a row.
+
+    Operators that act on the whole population at once are used instead of
+    those when set: population_selection_function is given the array of
+    fitnesses and a count and returns that many rows,
+    population_crossover_function is given two 2-D arrays of parents and
+    returns two of children, and population_mutate_function is given a 2-D
+    array of genes to change in place. population_tournament_selection,
+    population_crossover and population_mutate are provided for bit arrays.
+
+    The first population may be given as a 2-D array, initial_genes, whose
+    rows are topped up with create_individual if there are too few.
+
+    All of its randomness comes from rng, a NumPy Generator, which may be
+    passed as a keyword argument to make runs reproducible. Operators that
+    are supplied should draw from it too.
+
+    Fitness is calculated by fitness_function, one row at a time, unless an
+    array_fitness_function is set. That is called with the 2-D array of
+    genes, a boolean array of the rows to evaluate, a dict of state and the
+    seed data, and returns the fitness of those rows. The function may keep
+    arrays with a row per member in the state; each generation, they are
+    carried along with the members that the children were copied from.
+
+    """
+
+    def __init__(self, seed_data, *args, **kwargs):
+        """Instantiate the Genetic Algorithm, with the same parameters as a
+        GeneticAlgorithm and optionally rng, a NumPy Generator or seed.
+        """
+        rng = kwargs.pop('rng', None)
+        super(ArrayGeneticAlgorithm, self).__init__(seed_data, *args, **kwargs)
+        self.rng = np.random.default_rng(rng)
+
+        def create_individual(seed_data):
+            """Create a bit array the length of the seed data."""
+            return self.rng.integers(0, 2, len(seed_data))
+
+        def crossover(parent_1, parent_2):
+            """Crossover (mate) two parents to produce two children."""
+            index = self.rng.integers(1, len(parent_1))
+            child_1 = np.concatenate((parent_1[:index], parent_2[index:]))
+            child_2 = np.concatenate((parent_2[:index], parent_1[index:]))
+            return child_1, child_2
+
+        def mutate(individual):
+            """Reverse the bit of a random index in an individual, in place."""
+            mutate_index = self.rng.integers(len(individual))
+            individual[mutate_index] = individual[mutate_index] == 0
+
+        def random_selection(fitnesses):
+            """Select and return a random row of the population."""
+            return self.rng.integers(len(fitnesses))
+
+        def tournament_selection(fitnesses):
+            """Select a random number of rows from the population and return
+            the fittest of them all.
+            """
+            if self.tournament_size == 0:
+                self.tournament_size = 2
+            members = self.rng.choice(
+                len(fitnesses), self.tournament_size, replace=False)
+            best = np.argmax if self.maximise_fitness else np.argmin
+            return members[best(fitnesses[members])]
+
+        def population_tournament_selection(fitnesses, count):
+            """Hold a tournament of randomly drawn rows for each of count
+            selections, and return the rows of the winners.
+            """
+            if self.tournament_size == 0:
+                self.tournament_size = 2
+            members = self.rng.integers(
+                len(fitnesses), size=(count, self.tournament_size))
+            best = np.argmax if self.maximise_fitness else np.argmin
+            winners = best(fitnesses[members], axis=1)
+            return members[np.arange(count), winners]
+
+        def population_crossover(parents_1, parents_2):
+            """Crossover each pair of parents at a random point."""
+            points = self.rng.integers(1, parents_1.shape[1], len(parents_1))
+            mask = np.arange(parents_1.shape[1]) < points[:, None]
+            children_1 = np.where(mask, parents_1, parents_2)
+            children_2 = np.where(mask, parents_2, parents_1)
+            return children_1, children_2
+
+        def population_mutate(genes):
+            """Reverse the bit of a random index in each row, in place."""
+            rows = np.arange(len(genes))
+            indices = self.rng.integers(genes.shape[1], size=len(genes))
+            genes[rows, indices] = genes[rows, indices] == 0
+
+        self.array_fitness_function = None
+        self.population_tournament_selection = population_tournament_selection
+        self.population_crossover = population_crossover
+        self.population_mutate = population_mutate
+        self.population_selection_function = None
+        self.population_crossover_function = None
+        self.population_mutate_function = None
+        self.create_individual = create_individual
+        self.crossover_function = crossover
+        self.mutate_function = mutate
+        self.tournament_selection = tournament_selection
+        self.random_selection = random_selection
+        self.selection_function = self.tournament_selection
+
+        self.initial_genes = None
+        self.genes = self.fitnesses = self.dirty = None
+        self.state = {}
+        self.best = 0
+        self._buffers = None
+
+    def create_initial_population(self):
+        """Create members of the first population in arrays, from the rows of
+        initial_genes if it is set and randomly otherwise.
+        """
+        rows = [] if self.initial_genes is None \
+            else list(self.initial_genes[:self.population_size])
+        rows += [self.create_individual(self.seed_data)
+                 for _ in range(self.population_size - len(rows))]
+        self.genes = np.stack(rows)
+        self.fitnesses = np.zeros(self.population_size)
+        self.dirty = np.ones(self.population_size, dtype=bool)
+        self.state = {}
+
+        # the arrays the next generation is copied into
+        self._buffers = (np.empty_like(self.genes),
+                         np.empty_like(self.fitnesses),
+                         np.empty_like(self.dirty),
+                         {})
+
+    def calculate_population_fitness(self):
+        """Calculate the fitness of the dirty rows of the population, using
+        the fitness cache, other processes and the array_fitness_function as
+        for a GeneticAlgorithm.
+        """
+        if self.fitness_cache_size:
+            for row in np.flatnonzero(self.dirty):
+                key = self.genes[row].tobytes()
+                if key in self.fitness_cache:
+                    self.fitness_cache.move_to_end(key)
+                    self.fitnesses[row] = self.fitness_cache[key]
+                    self.dirty[row] = False
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+
+        rows = np.flatnonzero(self.dirty)
+        if not len(rows):
+            return
+        workers = self._fitness_workers()
+        if workers:
+            executor = self.executor or shared_executor(self.jobs)
+            chunks = np.array_split(rows, min(workers, len(rows)))
+            if self.array_fitness_function is not None:
+                function, kind = self.array_fitness_function, 'array'
+            else:
+                function, kind = self.fitness_function, 'genes'
+            futures = [executor.submit(_evaluate, function, kind,
+                                       self.genes[chunk], self.seed_data)
+                       for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                self.fitnesses[chunk] = future.result()
+        elif self.array_fitness_function is not None:
+            self.fitnesses[rows] = self.array_fitness_function(
+                self.genes, self.dirty, self.state, self.seed_data)
+        else:
+            for row in rows:
+                self.fitnesses[row] = self.fitness_function(
+                    self.genes[row], self.seed_data)
+        self.dirty[rows] = False
+
+        if self.fitness_cache_size:
+            for row in rows:
+                self.fitness_cache[self.genes[row].tobytes()] = \
+                    self.fitnesses[row]
+            while len(self.fitness_cache) > self.fitness_cache_size:
+                self.fitness_cache.popitem(last=False)
+
+    def rank_population(self):
+        """Find the fittest member of the population. The rows are not
+        reordered.
+        """
+        if self.maximise_fitness:
+            self.best = int(np.argmax(self.fitnesses))
+        else:
+            self.best = int(np.argmin(self.fitnesses))
+
+    def create_new_population(self):
+        """Create a new population in the spare arrays using the genetic
+        operators supplied, then swap them in.
+        """
+        genes, fitnesses, dirty, state = self._buffers
+        size = self.population_size
+        start = 1 if self.elitism else 0
+
+        # copy in the parents of each pair of children, and the elite, with a
+        # spare partner for the last row if it is unpaired
+        count = size + (size - start) % 2
+        if self.population_selection_function is not None:
+            parents = self.population_selection_function(self.fitnesses, count)
+        else:
+            parents = np.array([self.selection_function(self.fitnesses)
+                                for _ in range(count)])
+        if self.elitism:
+            parents[0] = self.best
+        np.take(self.genes, parents[:size], axis=0, out=genes)
+        np.take(self.fitnesses, parents[:size], out=fitnesses)
+        dirty[:] = False
+        for key, value in self.state.items():
+            if key not in state or state[key].shape != value.shape:
+                state[key] = np.empty_like(value)
+            np.take(value, parents[:size], axis=0, out=state[key])
+
+        # decide what happens to each pair
+        firsts = np.arange(start, size, 2)
+        can_crossover = self.rng.random(len(firsts)) < \
+            self.crossover_probability
+        can_mutate = self.rng.random(len(firsts)) < self.mutation_probability
+
+        crossing = firsts[can_crossover]
+        if len(crossing):
+            paired = crossing + 1 < size
+            partners = np.where(paired, crossing + 1, 0)
+            parents_2 = genes[partners]
+            if not paired[-1]:
+                parents_2[-1] = self.genes[parents[-1]]
+            if self.population_crossover_function is not None:
+                children_1, children_2 = self.population_crossover_function(
+                    genes[crossing], parents_2)
+            else:
+                children = [self.crossover_function(parent_1, parent_2)
+                            for parent_1, parent_2
+                            in zip(genes[crossing], parents_2)]
+                children_1 = np.stack([child for child, _ in children])
+                children_2 = np.stack([child for _, child in children])
+            genes[crossing] = children_1
+            genes[partners[paired]] = children_2[paired]
+
+        rows = np.stack((firsts, firsts + 1), axis=1)
+        mutating = rows[can_mutate].ravel()
+        mutating = mutating[mutating < size]
+        if len(mutating):
+            if self.population_mutate_function is not None:
+                mutants = genes[mutating]
+                self.population_mutate_function(mutants)
+                genes[mutating] = mutants
+            else:
+                for row in mutating:
+                    self.mutate_function(genes[row])
+
+        changed = rows[can_crossover | can_mutate].ravel()
+        dirty[changed[changed < size]] = True
+
+        self._buffers = (self.genes, self.fitnesses, self.dirty, self.state)
+        self.genes, self.fitnesses, self.dirty, self.state = \
+            genes, fitnesses, dirty, state
+
+    def best_individual(self):
+        """Return the individual with the best fitness in the current
+        generation.
+        """
+        return (self.fitnesses[self.best], self.genes[self.best])
+
+    def last_generation(self):
+        """Return members of the last generation as a generator function."""
+        return ((fitness, genes) for fitness, genes
+                in zip(self.fitnesses, self.genes))
+
+    def save_checkpoint(self, path, **extra):
+        """Save the population, its fitnesses and the state of rng to a
+        compressed NumPy file, along with any extra arrays or numbers given.
+
+        The file is written beside the path and then moved over it, so an
+        existing checkpoint is never left half written.
+        """
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as handle:
+            np.savez_compressed(
+                handle, genes=self.genes, fitnesses=self.fitnesses,
+                rng=json.dumps(self.rng.bit_generator.state), **extra)
+        os.replace(temporary, path)
+
+    def load_checkpoint(self, path):
+        """Restore the population, fitnesses and rng from a file written by
+        save_checkpoint, in place of creating the first generation, and
+        return the extra values saved with them.
+        """
+        with np.load(path, allow_pickle=False) as checkpoint:
+            values = dict(checkpoint)
+        self.genes = values.pop('genes')
+        self.fitnesses = values.pop('fitnesses')
+        self.rng.bit_generator.state = json.loads(str(values.pop('rng')))
+        self.population_size = len(self.genes)
+        self.dirty = np.zeros(self.population_size, dtype=bool)
+        self.state = {}
+        self._buffers = (np.empty_like(self.genes),
+                         np.empty_like(self.fitnesses),
+                         np.empty_like(self.dirty),
+                         {})
+        self.rank_population()
+        return values
+
+
 class Chromosome(object):
     """ Chromosome class that encapsulates an individual's fitness and solution
     representation.
     """
 
+    __slots__ = ('genes', 'fitness', 'dirty')
+
     def __init__(self, genes):
         """Initialise the Chromosome."""
         self.genes = genes
         self.fitness = 0
+        self.dirty = True
 
     def __repr__(self):
         """Return initialised Chromosome representation in human readable form.
         """
         return repr((self.fitness, self.genes))
+
+
+def _genome_key(genes):
+    """Return a hashable key for genes, using the raw bytes of arrays."""
+    if hasattr(genes, 'tobytes'):
+        return genes.tobytes()
+    return tuple(genes)
+
+
+# process pools shared by all GeneticAlgorithms, by number of workers, so that
+# workers are started once and reused across generations and runs
+_executors = {}
+
+
+def shared_executor(jobs=None):
+    """Return a process pool shared by all GeneticAlgorithms. A pool that is
+    broken, e.g. because a worker died, is replaced by a new one.
+
+    :param int jobs: number of worker processes; None or 0 for one per CPU
+    :returns: concurrent.futures.ProcessPoolExecutor
+
+    """
+    jobs = jobs or os.cpu_count()
+    executor = _executors.get(jobs)
+    if executor is None or getattr(executor, '_broken', False):
+        if executor is not None:
+            executor.shutdown(wait=False)
+        executor = _executors[jobs] = ProcessPoolExecutor(jobs)
+    return executor
+
+
+def _evaluate(function, kind, genes, seed_data):
+    """Calculate the fitness of some genes in a worker process, using a
+    fitness function of the given kind.
+    """
+    if kind == 'array':
+        return function(genes, np.ones(len(genes), dtype=bool), {}, seed_data)
+    return [function(x, seed_data) for x in genes]
@@ -21,7 +21,7 @@ REQUIRES_PYTHON = '>=3.5.0'
 
 # What packages are required for this module to be executed?
 REQUIRED = [
-    "numpy", "click<=6.7", "biopython", "pyyaml", "click_default_group", "dit", "bokeh", "colorama"
+    "numpy", "click<=6.7", "biopython", "pyyaml", "click_default_group", "bokeh", "colorama"
 ]
 
 # The rest you shouldn't have to touch too much :)
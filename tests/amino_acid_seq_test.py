@@ -1,6 +1,6 @@
 import pytest
 
-from freqgen import amino_acid_seq
+from freqgen import amino_acid_seq, amino_acid_seqs
 
 
 def test_length():
@@ -14,3 +14,10 @@ def test_frequencies_sum():
     with pytest.raises(ValueError):
         amino_acid_seq(length=1, frequencies=dict(A=0.5))
     assert amino_acid_seq(length=5, frequencies=dict(A=1)) == "AAAAA"
+
+def test_batch():
+    seqs = amino_acid_seqs(n=3, length=4, frequencies=dict(A=0.5, G=0.5))
+    assert len(seqs) == 3 and all(len(seq) == 4 and set(seq) <= {"A", "G"} for seq in seqs)
+    assert amino_acid_seqs(n=2, length=3, frequencies=dict(A=1), array=True).tolist() == [[65] * 3] * 2
+    with pytest.raises(ValueError):
+        amino_acid_seqs(n=0, length=3, frequencies=dict(A=1))
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 
 from freqgen import amino_acids_to_codons
@@ -13,3 +14,8 @@ def test_bad_dict():
 
     with pytest.raises(KeyError):
         amino_acids_to_codons("Q", dict(GCA=1.0, GCT=1.0, GCG=0, GCC=0))
+
+def test_batch():
+    frequencies = dict(GCA=1.0, GCT=0, GCG=0, GCC=0, ATG=1.0)
+    assert amino_acids_to_codons(["A", "MAA"], frequencies) == ["GCA", "ATGGCAGCA"]
+    assert amino_acids_to_codons(np.array([[77, 65], [65, 77]], dtype=np.uint8), frequencies) == ["ATGGCA", "GCAATG"]
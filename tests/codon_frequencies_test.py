@@ -214,3 +214,14 @@ def test_alternate_genetic_code():
     dummy_result = codon_frequencies("ATGATATAG", mode="relative", genetic_code=2)
     assert pytest.approx(dummy_result["ATG"], 0.5)
     assert pytest.approx(dummy_result["ATA"], 0.5)
+
+def test_generator():
+    assert codon_frequencies(s for s in ["ATG", "GATTAG"]) == codon_frequencies("ATGGATTAG")
+
+def test_relative_sums():
+    result = codon_frequencies("GATGATGACCTGNNN", mode="relative")
+    assert result["GAT"] == 2 / 3 and result["GAC"] == 1 / 3
+    assert result["CTG"] == 1.0
+    assert result["AAA"] == result["AAG"] == 0.5  # unused amino acids are uniform
+    assert "NNN" not in result
+    assert codon_frequencies("GATNNN")["NNN"] == 0.5
@@ -0,0 +1,28 @@
+import numpy as np
+from hypothesis import given
+from hypothesis import strategies as st
+
+from freqgen import cosine_distance, jensen_shannon_divergence
+
+
+def test_jensen_shannon_divergence():
+    assert jensen_shannon_divergence([1, 0], [0, 1]) == 1
+    assert jensen_shannon_divergence([0.5, 0.5, 0], [2, 2, 0]) == 0
+    assert np.isclose(jensen_shannon_divergence([3, 1], [1, 1]), 0.04879494)
+
+
+def test_cosine_distance():
+    assert cosine_distance([1, 0], [0, 1]) == 1
+    assert np.isclose(cosine_distance([1, 2], [2, 4]), 0)
+
+
+@given(
+    st.lists(st.integers(1, 100), min_size=4, max_size=4),
+    st.lists(st.integers(1, 100), min_size=4, max_size=4),
+)
+def test_rows(p, q):
+    rows = np.array([p, q])
+    assert np.allclose(
+        jensen_shannon_divergence(rows, p),
+        [jensen_shannon_divergence(p, p), jensen_shannon_divergence(q, p)],
+    )
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from freqgen import Evaluator, codon_frequencies, k_mer_frequencies
+from freqgen.generate import dna_to_codons
+
+TARGET = {
+    1: {"A": 0.4, "C": 0.1, "G": 0.2, "T": 0.3},
+    2: {"AA": 0.5, "TT": 0.5},
+    "codons": {"AAA": 0.5, "TTT": 0.25, "GGC": 0.25},
+    9: {"AAAAAAAAA": 0.5, "TTTTTTTTT": 0.5},
+}
+
+
+def euclidean_distance(seq):
+    # compare the dict representations over every k-mer in either
+    observed = k_mer_frequencies(seq, [1, 2, 9], include_missing=False)
+    observed["codons"] = codon_frequencies(seq)
+    return np.sqrt(
+        sum(
+            (TARGET[k].get(k_mer, 0) - observed[k].get(k_mer, 0)) ** 2
+            for k in TARGET
+            for k_mer in set(TARGET[k]) | set(observed[k])
+        )
+    )
+
+
+@settings(deadline=None)
+@given(st.lists(st.text("ACGT", min_size=12, max_size=12), min_size=1, max_size=5))
+def test_score_seqs(seqs):
+    seqs.append("AAAAAAAAAAAAAAA")  # a different length
+    scores = Evaluator(TARGET).score_seqs(seqs)
+    assert np.allclose(scores, [euclidean_distance(seq) for seq in seqs])
+
+
+@settings(deadline=None)
+@given(st.text("ACGT", min_size=30, max_size=90), st.integers(0, 2 ** 32 - 1))
+def test_array_and_move_fitness(seq, seed):
+    seq = seq[: len(seq) // 3 * 3]
+    evaluator = Evaluator(TARGET)
+    genome = dna_to_codons(seq)
+    state = {}
+    evaluator.array_fitness(genome[None], np.ones(1, dtype=bool), state)
+
+    rng = np.random.RandomState(seed)
+    positions = rng.randint(len(genome), size=8)
+    codons = rng.randint(64, size=8).astype(np.uint8)
+    expected = []
+    for position, codon in zip(positions, codons):
+        changed = genome.copy()
+        changed[position] = codon
+        expected.append(evaluator.score(changed))
+    assert np.allclose(evaluator.move_fitness(state, positions, codons), expected)
+
+    # updating the state gives the same as scoring from scratch
+    genome[positions] = codons
+    assert np.isclose(
+        evaluator.array_fitness(genome[None], np.ones(1, dtype=bool), state)[0],
+        evaluator.score(genome),
+    )
+
+
+def test_score():
+    evaluator = Evaluator({1: {"A": 0.5, "T": 0.5}}, mode="JSD")
+    assert evaluator.score(dna_to_codons("AAATTT")) == 0
+    assert evaluator.score(dna_to_codons("GGGCCC")) == 1
+
+
+def test_invalid_targets():
+    with pytest.raises(ValueError):
+        Evaluator({1: {"A": 0.5}})
+    with pytest.raises(ValueError):
+        Evaluator({"k": {"A": 1}})
+    with pytest.raises(ValueError):
+        Evaluator({True: {"A": 1}})
+    with pytest.raises(ValueError):
+        Evaluator({2: {"AAA": 1}})
+    with pytest.raises(ValueError):
+        Evaluator({"codons": {"AAAA": 1}})
+    with pytest.raises(ValueError):
+        Evaluator({1: {"A": 1}}, mode="KL")
+    with pytest.raises(ValueError):
+        Evaluator({4: {"AAAA": 1}}).score_seqs(["AAA"])
+
+
+@pytest.mark.parametrize("k", [2, 9])
+def test_other_bases(k):
+    # k-mers with N are left out of dense and sparse targets alike
+    target = {k: {"N" * k: 0.5, "T" * k: 0.5}}
+    assert Evaluator(target).score_seqs(["TTTTTTTTTTTT"])[0] == 0.5
+    with pytest.raises(ValueError):
+        Evaluator({9: {"AAA": 1}})
+
+
+def test_numpy_integer_keys():
+    # as from targets built with array code
+    target = {np.int64(k): frequencies for k, frequencies in TARGET.items() if k != "codons"}
+    genome = dna_to_codons("ATGAAATTTGGCAAAAAAAAATTT")
+    assert Evaluator(target).score(genome) == Evaluator(
+        {k: TARGET[k] for k in [1, 2, 9]}
+    ).score(genome)
+    assert Evaluator(target).dense_k == [1, 2]
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from freqgen import FrequencyProfile, k_mer_frequencies
+
+
+def test_frequencies():
+    profile = FrequencyProfile([1, 2], codons=True).update(["GATGATGGC", "ATGTAA"])
+    assert profile.sequences == 2
+    assert profile.frequencies() == k_mer_frequencies(["GATGATGGC", "ATGTAA"], [1, 2], codons=True)
+    assert np.array_equal(profile.frequencies(vector=True), k_mer_frequencies(["GATGATGGC", "ATGTAA"], [1, 2], vector=True))
+
+def test_add_and_subtract():
+    a = FrequencyProfile([1, 3], codons=True).update("GATGATGGC")
+    b = FrequencyProfile([1, 3], codons=True).update("ATGTAANNN")
+    both = a + b
+    assert both.frequencies() == k_mer_frequencies(["GATGATGGC", "ATGTAANNN"], [1, 3], codons=True)
+    assert (both - b).frequencies() == a.frequencies()
+    assert np.array_equal((both - b).counts(3), a.counts(3))
+
+    a += b
+    assert a.frequencies() == both.frequencies()
+    assert a.sequences == 2
+
+def test_sparse():
+    a = FrequencyProfile(12, sparse=True).update("GATTACAGATTACA")
+    b = FrequencyProfile(12, sparse=True).update("ATGCATGCATGC")
+    indices, counts = (a + b - a).counts(12)
+    assert np.array_equal(indices, b.counts(12)[0])
+    assert counts.tolist() == [1]
+
+def test_incompatible():
+    with pytest.raises(ValueError):
+        FrequencyProfile(1) + FrequencyProfile(2)
+    with pytest.raises(ValueError):
+        FrequencyProfile(1) + FrequencyProfile(1, codons=True)
+
+def test_counts_not_profiled():
+    profile = FrequencyProfile(2).update("GATTACA")
+    with pytest.raises(ValueError):
+        profile.counts("codons")
+    with pytest.raises(ValueError):
+        profile.counts(3)
+    with pytest.raises(ValueError):
+        FrequencyProfile(codons=True).update("ATG").counts(1)
@@ -1,4 +1,8 @@
-from freqgen import generate
+from Bio.Seq import Seq
+import numpy as np
+import pytest
+from freqgen import Evaluator, generate
+from freqgen.generate import dna_to_codons
 
 
 def test_1mer():
@@ -71,3 +75,273 @@ def test_codon():
                            'TTG': 0,
                            'TTT': 0})
     assert generate(targets, "TT*") in ["ACTACCTAG", "ACCACTTAG"]
+
+
+def test_missing_k_mers():
+    assert generate({1: dict(A=0.5, T=0.5)}, "FK") == "TTTAAA"
+
+
+def test_sparse():
+    # k > 8 is compared over only the k-mers that occur
+    assert generate({9: {"TTTAAATTT": 0.5, "TTAAATTTA": 0.5}}, "FKF") == "TTTAAATTT"
+
+
+def test_codons_round_trip():
+    from freqgen.generate import codons_to_dna, dna_to_codons
+
+    assert list(dna_to_codons("AAATTTATG")) == [0, 63, 14]
+    assert codons_to_dna(dna_to_codons("AAATTTATG")) == "AAATTTATG"
+
+
+def test_preserves_translation():
+    aa_seq = "MKLVWAGSTRPQ*"
+    seq = generate({2: {"AA": 1}}, aa_seq, max_gens_since_improvement=5)
+    assert str(Seq(seq).translate()) == aa_seq
+
+    # Biopython sequences are accepted too
+    seq = generate({2: {"AA": 1}}, Seq(aa_seq), max_gens_since_improvement=5)
+    assert str(Seq(seq).translate()) == aa_seq
+
+
+def test_delta_table():
+    from freqgen.freqgen import _CODON_CODES, _k_mer_indices
+    from freqgen.generate import _delta_table
+
+    def listing(genome, k):
+        codes = _CODON_CODES[genome].ravel()
+        return np.concatenate([_k_mer_indices(codes, _k) for _k in k] + [genome, [0]])
+
+    np.random.seed(0)
+    k = [1, 2, 4, 7]
+    slots, shifts = _delta_table(20, k, True)
+    genome = np.random.randint(64, size=20).astype(np.uint8)
+    for position in [0, 1, 10, 18, 19]:
+        mutant = genome.copy()
+        mutant[position] = (mutant[position] + 21) % 64
+        expected = listing(genome, k).astype(np.int64)
+        change = _CODON_CODES[mutant[position]].astype(np.int64) - _CODON_CODES[genome[position]]
+        expected[slots[position]] += (shifts[position] * change).sum(axis=1)
+        assert (expected == listing(mutant, k)).all()
+
+
+def test_modes():
+    for mode in ["JSD", "cosine"]:
+        assert generate({1: dict(A=0.5, T=0.5, G=0, C=0)}, "FK", mode=mode) == "TTTAAA"
+
+
+def test_fitness_cache():
+    assert generate({1: dict(A=0.5, T=0.5)}, "FK", fitness_cache_size=10) == "TTTAAA"
+
+    # clones and cached genomes are not evaluated again
+    from freqgen.pyeasyga import GeneticAlgorithm
+
+    evaluated = []
+    ga = GeneticAlgorithm([0, 1, 0, 1], population_size=20, fitness_cache_size=4)
+    ga.fitness_function = lambda genes, data: evaluated.append(genes) or sum(genes)
+    ga.create_first_generation()
+    for _ in range(5):
+        ga.create_next_generation()
+    assert len(evaluated) == ga.cache_misses
+    assert ga.cache_hits > 0
+    assert len(ga.fitness_cache) <= 4
+
+
+def test_jobs():
+    from concurrent.futures import ProcessPoolExecutor
+    from freqgen import k_mer_frequencies
+
+    # scoring chunks in other processes gives the same result as scoring in
+    # this one, which updates the counts of mutated genomes incrementally
+    target = k_mer_frequencies(
+        [
+            "ATGGCTAGCAAAGGAGAAGAACTTTTCACTGGAGTTGTCCCAATTCTTGTTGAATTAGATGGTGATGTT"
+            "AATGGGCACAAATTTTCTGTC"
+        ],
+        [1, 2],
+    )
+    aa_seq = (
+        "MSKGEELFTGVVPILVELDGDVNGHKFSVSGEGEGDATYGKLTLKFICTTGKLPVPWPTLVTTFSYGVQ"
+        "CFSRYPDHMKQHDFFKSAMPEGYVQER"
+    )
+    settings = dict(max_gens_since_improvement=10, population_size=20, seed=1)
+    serial = generate(target, aa_seq, **settings)
+    with ProcessPoolExecutor(2) as executor:
+        assert generate(target, aa_seq, executor=executor, **settings) == serial
+    assert generate(target, aa_seq, jobs=2, **settings) == serial
+    assert str(Seq(serial).translate()) == aa_seq
+
+
+def test_fitness_workers(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from freqgen.pyeasyga import GeneticAlgorithm
+
+    # at most one process per CPU, and none on a single CPU
+    monkeypatch.setattr("os.cpu_count", lambda: 4)
+    assert GeneticAlgorithm([], jobs=2)._fitness_workers() == 2
+    assert GeneticAlgorithm([], jobs=8)._fitness_workers() == 4
+    assert GeneticAlgorithm([], jobs=None)._fitness_workers() == 4
+    assert GeneticAlgorithm([], jobs=1)._fitness_workers() == 0
+    monkeypatch.setattr("os.cpu_count", lambda: 1)
+    assert GeneticAlgorithm([], jobs=2)._fitness_workers() == 0
+    with ThreadPoolExecutor(2) as executor:
+        assert GeneticAlgorithm([], jobs=2, executor=executor)._fitness_workers() == 2
+
+
+def test_broken_executor():
+    import os
+    from concurrent.futures.process import BrokenProcessPool
+    from freqgen.pyeasyga import shared_executor
+
+    # a worker dying breaks the shared pool, which is then replaced
+    with pytest.raises(BrokenProcessPool):
+        shared_executor(2).submit(os._exit, 1).result()
+    seq = generate({1: dict(A=0.5, T=0.5)}, "KKF", islands=2, jobs=2, max_gens_since_improvement=5)
+    assert str(Seq(seq).translate()) == "KKF"
+
+
+@pytest.mark.parametrize("whole_population", [False, True])
+def test_array_genetic_algorithm(whole_population):
+    from freqgen.pyeasyga import ArrayGeneticAlgorithm
+
+    # each generation is copied into the spare arrays, which are then swapped
+    ga = ArrayGeneticAlgorithm(
+        np.zeros(6, dtype=np.uint8), population_size=11, maximise_fitness=False
+    )
+    ga.create_individual = lambda data: np.random.randint(0, 2, len(data)).astype(np.uint8)
+    ga.fitness_function = lambda genes, data: int(genes.sum())
+    if whole_population:
+        ga.population_selection_function = ga.population_tournament_selection
+        ga.population_crossover_function = ga.population_crossover
+        ga.population_mutate_function = ga.population_mutate
+    ga.create_first_generation()
+    genes = ga.genes
+    for _ in range(20):
+        best = ga.best_individual()[0]
+        ga.create_next_generation()
+        assert ga.best_individual()[0] <= best
+        assert (ga.fitnesses == ga.genes.sum(axis=1)).all()
+        assert set(np.unique(ga.genes)) <= {0, 1}
+    assert ga.genes is genes or ga._buffers[0] is genes
+    assert ga.genes.shape == (11, 6)
+
+
+def test_islands():
+    results = []
+    for jobs in [1, 2]:
+        results.append(
+            generate(
+                {2: {"AA": 0.5, "TT": 0.5}},
+                "MKFLV",
+                population_size=10,
+                max_gens_since_improvement=5,
+                islands=3,
+                migration_interval=2,
+                migration_size=2,
+                jobs=jobs,
+                seed=0,
+            )
+        )
+    assert results[0] == results[1]
+    assert str(Seq(results[0]).translate()) == "MKFLV"
+    with pytest.raises(ValueError):
+        generate({1: dict(A=0.5, T=0.5)}, "FK", islands=0)
+
+
+def test_anneal():
+    assert generate({1: dict(A=0.5, T=0.5)}, "FK", optimizer="anneal") == "TTTAAA"
+    seq = generate({2: {"AA": 0.5, "TT": 0.5}}, "MKFLVAG", optimizer="anneal", iterations=200)
+    assert str(Seq(seq).translate()) == "MKFLVAG"
+    with pytest.raises(ValueError):
+        generate({1: dict(A=0.5, T=0.5)}, "FK", optimizer="simplex")
+    with pytest.raises(ValueError):
+        generate({1: dict(A=0.5, T=0.5)}, "FK", optimizer="anneal", iterations=-1)
+
+    # no iterations leaves the random starting sequence
+    seq = generate({1: dict(A=0.5, T=0.5)}, "FKFK", optimizer="anneal", iterations=0, seed=0)
+    assert str(Seq(seq).translate()) == "FKFK"
+
+
+def test_beam():
+    assert generate({1: dict(A=0.5, T=0.5)}, "FK", optimizer="beam") == "TTTAAA"
+    target = {2: {"AA": 0.5, "TT": 0.5}, "codons": {"AAA": 0.5, "TTT": 0.5}}
+    seq = generate(target, "MKFLVAG", optimizer="beam", beam_width=4)
+    assert str(Seq(seq).translate()) == "MKFLVAG"
+    assert seq == generate(target, "MKFLVAG", optimizer="beam", beam_width=4)
+
+    # beam search can seed the other optimizers
+    for optimizer in ["ga", "anneal"]:
+        seq = generate(
+            target, "MKFLVAG", optimizer=optimizer, beam_width=4, max_gens_since_improvement=5
+        )
+        assert str(Seq(seq).translate()) == "MKFLVAG"
+
+
+@pytest.mark.parametrize("optimizer", ["ga", "anneal"])
+def test_seed_and_restarts(optimizer):
+    target = {2: {"AA": 0.5, "TT": 0.5}, "codons": {"AAA": 0.5, "TTT": 0.5}}
+    aa_seq = "MKFLVAGSRL"
+    settings = dict(optimizer=optimizer, max_gens_since_improvement=5, iterations=100)
+    assert generate(target, aa_seq, seed=1, **settings) == generate(
+        target, aa_seq, seed=1, **settings
+    )
+
+    # each restart can be reproduced alone, and the fittest is returned
+    evaluator = Evaluator(target)
+    runs = [
+        generate(target, aa_seq, seed=seed, **settings)
+        for seed in np.random.SeedSequence(2).spawn(3)
+    ]
+    best = min(runs, key=lambda seq: evaluator.score(dna_to_codons(seq)))
+    for jobs in [1, 2]:
+        assert generate(target, aa_seq, seed=2, restarts=3, jobs=jobs, **settings) == best
+    with pytest.raises(ValueError):
+        generate(target, aa_seq, restarts=0)
+
+
+def test_generate_many():
+    from freqgen import generate_many
+
+    target = {2: {"AA": 0.5, "TT": 0.5}}
+    aa_seqs = ["MKFLV", "MKV", "FK"]
+    results = {}
+    for jobs in [1, 2]:
+        results[jobs] = dict(
+            generate_many(target, aa_seqs, jobs=jobs, seed=0, max_gens_since_improvement=5)
+        )
+        assert sorted(results[jobs]) == [0, 1, 2]
+        for i, aa_seq in enumerate(aa_seqs):
+            assert str(Seq(results[jobs][i]).translate()) == aa_seq
+    assert results[1] == results[2]
+
+
+def test_checkpoint(tmpdir, monkeypatch):
+    from freqgen.pyeasyga import ArrayGeneticAlgorithm
+
+    target = {2: {"AA": 0.5, "TT": 0.5}, "codons": {"AAA": 0.5, "TTT": 0.5}}
+    aa_seq = "MKFLVAGSRLMKFLVAGSRL"
+    settings = dict(seed=5, max_gens_since_improvement=20)
+    uninterrupted = generate(target, aa_seq, **settings)
+
+    # stop partway through, as if interrupted
+    create_next_generation = ArrayGeneticAlgorithm.create_next_generation
+    generations = []
+
+    def interrupt(self):
+        generations.append(None)
+        if len(generations) == 15:
+            raise KeyboardInterrupt
+        create_next_generation(self)
+
+    monkeypatch.setattr(ArrayGeneticAlgorithm, "create_next_generation", interrupt)
+    checkpoint = str(tmpdir.join("checkpoint.npz"))
+    generate(target, aa_seq, checkpoint=checkpoint, checkpoint_interval=4, **settings)
+    monkeypatch.undo()
+
+    # resuming continues the same run
+    assert generate(target, aa_seq, resume_from=checkpoint, **settings) == uninterrupted
+    with pytest.raises(ValueError):
+        generate(target, "MKV", resume_from=checkpoint)
+    with pytest.raises(ValueError):
+        generate(target, aa_seq, checkpoint=checkpoint, optimizer="anneal")
+    with pytest.raises(ValueError):
+        generate(target, aa_seq, checkpoint=checkpoint, checkpoint_interval=0)
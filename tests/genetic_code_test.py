@@ -0,0 +1,22 @@
+import numpy as np
+
+from freqgen import GeneticCode, codons_for_aa, genetic_codes, synonymous_codons
+
+
+def test_tables():
+    code = GeneticCode.get(11)
+    assert GeneticCode.get(11) is code
+    assert genetic_codes[11]["TAA"] == "*"
+    assert codons_for_aa[11]["M"] == ["ATG"]
+    assert synonymous_codons[11]["GAT"] == ["GAT", "GAC"]
+    assert len(genetic_codes) == len(list(genetic_codes))
+
+def test_arrays():
+    code = GeneticCode.get(2)  # vertebrate mitochondrial, in which ATA codes for M
+    assert code.amino_acids[code.codon_amino_acids[12]] == "M"  # ATA
+    assert code.degeneracy[12] == 2
+    for aa, codons in code.codons_for_aa.items():
+        row = code.amino_acid_indices[ord(aa)]
+        start, end = code.synonym_offsets[row], code.synonym_offsets[row + 1]
+        assert np.array_equal(code.synonyms[start:end], code.codon_choices[row, : end - start])
+        assert end - start == len(codons)
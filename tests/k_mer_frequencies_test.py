@@ -93,3 +93,50 @@ def test_invalid_args():
 @given(st.lists(elements=st.sampled_from(["".join(codon) for codon in product("ATGC", repeat=3)]), min_size=1))
 def test_codon_frequencies(s):
     assert k_mer_frequencies(s, 1, codons=True)["codons"] == codon_frequencies(s)
+
+def test_non_dna_characters():
+    # k-mers spanning anything but ACGT are counted by name
+    assert k_mer_frequencies("ACNGT", 2, include_missing=False) == {2: {"AC": 0.25, "CN": 0.25, "NG": 0.25, "GT": 0.25}}
+    assert k_mer_frequencies("acgt", 2, include_missing=False) == {2: {"AC": 1 / 3, "CG": 1 / 3, "GT": 1 / 3}}
+
+@given(st.text(alphabet="ATGC", min_size=6))
+def test_vector_matches_dict(s):
+    frequencies = k_mer_frequencies(s, [1, 2, 3], include_missing=True)
+    vector = np.concatenate([[frequencies[k][k_mer] for k_mer in sorted(frequencies[k])] for k in (1, 2, 3)])
+    assert np.array_equal(k_mer_frequencies(s, [1, 2, 3], include_missing=True, vector=True), vector)
+
+def test_generator():
+    seqs = ["GATGATGGC", "TTAGGC"]
+    assert k_mer_frequencies((s for s in seqs), [1, 2], codons=True) == k_mer_frequencies(seqs, [1, 2], codons=True)
+    with pytest.raises(ValueError):
+        k_mer_frequencies((s for s in []), 1)
+
+@given(st.lists(st.text(alphabet="ATGCN", min_size=6), min_size=1, max_size=4))
+def test_multiple_k_matches_single_k(seqs):
+    # smaller k are derived from the largest k, so check them against counting each k alone
+    frequencies = k_mer_frequencies(seqs, [1, 2, 4, 6], include_missing=False)
+    for k in (1, 2, 4, 6):
+        assert frequencies[k] == k_mer_frequencies(seqs, k, include_missing=False)[k]
+
+def test_jobs():
+    seqs = ["GATGATGGC", "TTAGGCNNA", "ACGTACGTA"] * 10
+    assert k_mer_frequencies(seqs, [1, 3], codons=True, jobs=2) == k_mer_frequencies(seqs, [1, 3], codons=True)
+
+def test_sparse():
+    indices, frequencies = k_mer_frequencies("GATGATGGC", 2, sparse=True)[2]
+    # AT, GA, GC, GG, TG
+    assert indices.tolist() == [3, 8, 9, 10, 14]
+    assert frequencies.tolist() == [0.25, 0.25, 0.125, 0.125, 0.25]
+    assert len(k_mer_frequencies("GATTACA" * 4, 20, sparse=True)[20][0]) == 7
+    with pytest.raises(ValueError):
+        k_mer_frequencies("GATGATGGC", 2, sparse=True, vector=True)
+
+
+def test_k_mer_indices_rows():
+    from freqgen.freqgen import _k_mer_indices
+
+    codes = np.random.randint(4, size=(5, 30)).astype(np.uint8)
+    for k in [1, 3, 8]:
+        rows = _k_mer_indices(codes, k)
+        for row, seq in zip(rows, codes):
+            assert (row == _k_mer_indices(seq, k)).all()